@@ -610,13 +610,14 @@ async def create_campaign_sequence(campaign_id: str, sequence_data: SequenceCrea
         day_counter += 1
 
     # Create sequence
+    now = datetime.now(timezone.utc).isoformat()
     sequence = {
         "id": str(uuid.uuid4()),
         "campaign_id": campaign_id,
         "touchpoint_config": sequence_data.touchpoint_config.model_dump(),
         "steps": steps,
-        "created_at": datetime.now(timezone.utc).isoformat(),
-        "updated_at": datetime.now(timezone.utc).isoformat()
+        "created_at": now,
+        "updated_at": now
     }
 
     await db.campaign_sequences.insert_one(sequence.copy())
@@ -6,12 +6,15 @@ Uses vector embeddings for fast semantic search
 
 from typing import List, Dict, Any, Optional
 from datetime import datetime
+import hashlib
 import logging
 import sqlite3
 import numpy as np
 import json
 from pathlib import Path
 
+from config.date_utils import format_published_date
+
 logger = logging.getLogger(__name__)
 
 # Try to import sentence-transformers, fallback gracefully
@@ -53,6 +56,14 @@ class VectorDatabase:
         self.embedding_model = None
         self.embedding_dimension = 384  # all-MiniLM-L6-v2 dimension
 
+        # Embeddings keyed by content hash of "title. summary" so unchanged case studies are never re-embedded
+        self._embedding_cache: Dict[str, np.ndarray] = {}
+
+        # Decoded case study rows + normalized embedding matrix for search, tagged with the
+        # (row count, latest updated_at) they were loaded at so writes from other processes invalidate it
+        self._search_cache = None
+        self._search_cache_version = None
+
         # Initialize embedding model
         import os
         os.environ["HF_HUB_DISABLE_SSL_VERIFY"] = "1"
@@ -72,6 +83,7 @@ class VectorDatabase:
 
         # Create database and table
         self._init_database()
+        self._load_embedding_cache()
 
     def _init_database(self):
         """Create SQLite database and table with vector support"""
@@ -106,6 +118,63 @@ class VectorDatabase:
         except Exception as e:
             logger.error(f"Error initializing vector database: {e}")
 
+    @staticmethod
+    def _content_hash(text: str) -> str:
+        """Short content hash used as the embedding cache key"""
+        return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+    def _load_embedding_cache(self):
+        """Populate the embedding cache from embeddings already stored in SQLite"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            cursor.execute("SELECT title, summary, embedding FROM case_studies WHERE embedding IS NOT NULL")
+            for title, summary, embedding_bytes in cursor.fetchall():
+                key = self._content_hash(f"{title}. {summary}")
+                self._embedding_cache[key] = np.frombuffer(embedding_bytes, dtype=np.float32)
+            conn.close()
+            logger.info(f"✓ Loaded {len(self._embedding_cache)} cached case study embeddings")
+        except Exception as e:
+            logger.error(f"Error loading embedding cache: {e}")
+
+    def _get_search_matrix(self, cursor):
+        """
+        Get (rows, normalized embedding matrix) for all stored case studies,
+        reloading from SQLite only when the table has changed
+        """
+        cursor.execute("SELECT COUNT(*), MAX(updated_at) FROM case_studies")
+        version = cursor.fetchone()
+
+        if self._search_cache is None or version != self._search_cache_version:
+            cursor.execute("""
+                SELECT file_id, file_url, title, summary, category, embedding
+                FROM case_studies
+            """)
+            rows = []
+            vectors = []
+            for file_id, file_url, title, summary, category, embedding_bytes in cursor.fetchall():
+                rows.append({
+                    'file_id': file_id,
+                    'file_url': file_url,
+                    'title': title,
+                    'summary': summary,
+                    'category': category
+                })
+                vectors.append(np.frombuffer(embedding_bytes, dtype=np.float32))
+
+            if vectors:
+                matrix = np.vstack(vectors)
+                norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+                norms[norms == 0] = 1.0
+                matrix = matrix / norms
+            else:
+                matrix = np.empty((0, self.embedding_dimension), dtype=np.float32)
+
+            self._search_cache = (rows, matrix)
+            self._search_cache_version = version
+
+        return self._search_cache
+
     def generate_embedding(self, text: str) -> Optional[np.ndarray]:
         """
         Generate embedding vector for text
@@ -148,14 +217,19 @@ class VectorDatabase:
             True if successful, False otherwise
         """
         try:
-            # Generate embedding from title + summary
+            # Generate embedding from title + summary, reusing it if this content was embedded before
             combined_text = f"{title}. {summary}"
-            embedding = self.generate_embedding(combined_text)
+            content_key = self._content_hash(combined_text)
+            embedding = self._embedding_cache.get(content_key)
+            if embedding is None:
+                embedding = self.generate_embedding(combined_text)
 
             if embedding is None:
                 logger.warning(f"Skipping case study {file_id} - embeddings not available")
                 return False
 
+            self._embedding_cache[content_key] = embedding
+
             # Convert numpy array to bytes for storage
             embedding_bytes = embedding.tobytes()
 
@@ -171,6 +245,7 @@ class VectorDatabase:
 
             conn.commit()
             conn.close()
+            self._search_cache = None
 
             logger.info(f"✓ Stored case study: {title} (ID: {file_id})")
             return True
@@ -207,33 +282,21 @@ class VectorDatabase:
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
 
-            # Fetch all case studies
-            cursor.execute("""
-                SELECT file_id, file_url, title, summary, category, embedding
-                FROM case_studies
-            """)
+            # Fetch all case studies (decoded and normalized once, reused until the table changes)
+            rows, matrix = self._get_search_matrix(cursor)
 
-            results = []
-            for row in cursor.fetchall():
-                file_id, file_url, title, summary, category, embedding_bytes = row
-
-                # Convert bytes back to numpy array
-                stored_embedding = np.frombuffer(embedding_bytes, dtype=np.float32)
+            conn.close()
 
-                # Calculate cosine similarity
-                similarity = self._cosine_similarity(query_embedding, stored_embedding)
+            # Calculate cosine similarity against every stored embedding at once
+            query_norm = np.linalg.norm(query_embedding)
+            if query_norm == 0 or not rows:
+                return []
+            similarities = matrix @ (query_embedding / query_norm)
 
+            results = []
+            for row, similarity in zip(rows, similarities):
                 if similarity >= min_similarity:
-                    results.append({
-                        'file_id': file_id,
-                        'file_url': file_url,
-                        'title': title,
-                        'summary': summary,
-                        'category': category,
-                        'similarity': float(similarity)
-                    })
-
-            conn.close()
+                    results.append({**row, 'similarity': float(similarity)})
 
             # Sort by similarity (highest first) and return top_k
             results.sort(key=lambda x: x['similarity'], reverse=True)
@@ -321,6 +384,7 @@ class VectorDatabase:
 
             conn.commit()
             conn.close()
+            self._search_cache = None
 
             logger.info(f"✓ Deleted case study: {file_id}")
             return True
@@ -1050,6 +1114,10 @@ Do not include any explanation, just the score.
                 {"_id": 0}
             ).sort("published_date", -1).limit(max_results).to_list(max_results)
 
+            # published_date is stored as a BSON date; prompts expect the ISO string
+            for news in news_items:
+                news['published_date'] = format_published_date(news.get('published_date'))
+
             if news_items:
                 logger.info(f"✓ Found {len(news_items)} Zuci news items")
                 return news_items
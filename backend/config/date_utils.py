@@ -0,0 +1,14 @@
+"""
+Date helpers shared by the API routes and the config layer
+"""
+from datetime import datetime, timedelta
+from typing import Optional, Union
+
+
+def format_published_date(value: Union[datetime, str, None]) -> Optional[str]:
+    """Serialize a stored published_date back to ISO format (date-only when it falls on midnight)"""
+    if not isinstance(value, datetime):
+        return value
+    if value.time() == datetime.min.time() and value.utcoffset() in (None, timedelta(0)):
+        return value.date().isoformat()
+    return value.isoformat()
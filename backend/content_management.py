@@ -81,6 +81,7 @@ class GTMEntry(BaseModel):
 @router.post("/zuci-wins", response_model=ZuciWin)
 async def create_zuci_win(win_data: ZuciWinCreate, current_user: User = Depends(get_current_user)):
     """Create a new Zuci Win entry"""
+    now = datetime.now(timezone.utc).isoformat()
     win = {
         "id": str(uuid.uuid4()),
         "company_name": win_data.company_name,
@@ -88,8 +89,8 @@ async def create_zuci_win(win_data: ZuciWinCreate, current_user: User = Depends(
         "win_date": win_data.win_date,
         "contributions": [c.model_dump() for c in win_data.contributions],
         "created_by": current_user.id,
-        "created_at": datetime.now(timezone.utc).isoformat(),
-        "updated_at": datetime.now(timezone.utc).isoformat()
+        "created_at": now,
+        "updated_at": now
     }
 
     await db.zuci_wins.insert_one(win)
@@ -168,6 +169,7 @@ async def delete_zuci_win(win_id: str, current_user: User = Depends(get_current_
 @router.post("/gtm-entries", response_model=GTMEntry)
 async def create_gtm_entry(gtm_data: GTMEntryCreate, current_user: User = Depends(get_current_user)):
     """Create a new GTM entry"""
+    now = datetime.now(timezone.utc).isoformat()
     gtm = {
         "id": str(uuid.uuid4()),
         "gtm_link": gtm_data.gtm_link,
@@ -175,8 +177,8 @@ async def create_gtm_entry(gtm_data: GTMEntryCreate, current_user: User = Depend
         "prospect_name": gtm_data.prospect_name,
         "date": gtm_data.date,
         "created_by": current_user.id,
-        "created_at": datetime.now(timezone.utc).isoformat(),
-        "updated_at": datetime.now(timezone.utc).isoformat()
+        "created_at": now,
+        "updated_at": now
     }
 
     await db.gtm_entries.insert_one(gtm)
@@ -30,6 +30,40 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Case study type detection: (page phrases, type), first matching rule wins
+CASE_TYPE_RULES = (
+    (('success story', 'customer story'), "Success Story"),
+    (('use case',), "Use Case"),
+    (('transformation',), "Transformation Story"),
+    (('solution',), "Industry Solution"),
+)
+
+# Category detection: first keyword found in the page wins
+CATEGORY_KEYWORDS = ('AI', 'Healthcare', 'Finance', 'Retail', 'Manufacturing', 'Technology', 'Education', 'E-commerce')
+
+# Every lowercase phrase the page is scanned for
+PAGE_KEYWORDS = tuple(dict.fromkeys(
+    [phrase for phrases, _ in CASE_TYPE_RULES for phrase in phrases] +
+    [keyword.lower() for keyword in CATEGORY_KEYWORDS]
+))
+
+
+# Elements that carry a case study page's type/category signal, and how many of them to read
+PAGE_SIGNAL_TAGS = ['title', 'h1', 'h2', 'h3', 'p']
+PAGE_SIGNAL_LIMIT = 30
+
+
+def get_page_signal_text(soup: BeautifulSoup, description: Optional[str]) -> str:
+    """Lowercased description plus the first title/heading/paragraph texts, instead of the whole page"""
+    parts = [description or '']
+    parts.extend(tag.get_text(' ', strip=True) for tag in soup.find_all(PAGE_SIGNAL_TAGS, limit=PAGE_SIGNAL_LIMIT))
+    return ' '.join(parts).lower()
+
+
+def find_page_keywords(page_text: str) -> Set[str]:
+    """Return which PAGE_KEYWORDS occur (as substrings) in lowercased page text"""
+    return {keyword for keyword in PAGE_KEYWORDS if keyword in page_text}
+
 # Router
 router = APIRouter(prefix="/api", tags=["document_management"])
 
@@ -54,6 +88,11 @@ def set_case_study_manager(manager):
     global case_study_manager
     case_study_manager = manager
 
+async def create_indexes():
+    """Create MongoDB indexes used by document file lookups"""
+    # Scraper matches existing case study files by filename
+    await db.document_files.create_index([('filename', 1)])
+
 # ============== MODELS ==============
 
 class CaseStudyExtractRequest(BaseModel):
@@ -460,7 +499,7 @@ async def crawl_zuci_with_playwright() -> List[Dict[str, Any]]:
                     # Extract information
                     title = await page.title()
                     html = await page.content()
-                    soup = BeautifulSoup(html, 'html.parser')
+                    soup = BeautifulSoup(html, 'lxml')
                     logger.info(f"   ✓ Loaded: {title[:60]}")
 
                     # Extract description
@@ -567,14 +606,24 @@ async def crawl_zuci_with_playwright() -> List[Dict[str, Any]]:
 
     return case_studies
 
+# Request timeouts shared by the crawler session instead of being built per request
+PAGE_TIMEOUT = aiohttp.ClientTimeout(total=30)
+HOMEPAGE_TIMEOUT = aiohttp.ClientTimeout(total=20)
+
+# Read size for streamed PDF downloads; a multiple of 3 so full chunks encode without a carried remainder
+PDF_CHUNK_SIZE = 64 * 1024 - (64 * 1024) % 3
+
 async def download_pdf(session: aiohttp.ClientSession, url: str) -> tuple:
-    """Download PDF file and return content + size"""
+    """
+    Download a PDF file and return (base64 content, raw size)
+    The body is base64-encoded as it streams in, so the raw PDF is never held in memory whole
+    """
     max_retries = 3
     retry_delay = 2
 
     for attempt in range(max_retries):
         try:
-            async with session.get(url, timeout=aiohttp.ClientTimeout(total=30)) as response:
+            async with session.get(url) as response:
                 if response.status == 403:
                     logger.warning(f"Got 403 for PDF {url} on attempt {attempt + 1}/{max_retries}")
                     if attempt < max_retries - 1:
@@ -585,8 +634,20 @@ async def download_pdf(session: aiohttp.ClientSession, url: str) -> tuple:
                         return None, 0
 
                 if response.status == 200:
-                    content = await response.read()
-                    return content, len(content)
+                    encoded = bytearray()
+                    pending = b''
+                    size = 0
+                    async for chunk in response.content.iter_chunked(PDF_CHUNK_SIZE):
+                        size += len(chunk)
+                        if pending:
+                            chunk = pending + chunk
+                        # Encode whole 3-byte groups now, carry the remainder to the next chunk
+                        cut = len(chunk) - len(chunk) % 3
+                        encoded += base64.b64encode(chunk[:cut])
+                        pending = chunk[cut:]
+                    if pending:
+                        encoded += base64.b64encode(pending)
+                    return bytes(encoded), size
                 else:
                     logger.warning(f"Failed to download PDF {url}: {response.status}")
                     return None, 0
@@ -615,7 +676,7 @@ async def extract_case_study_info(session: aiohttp.ClientSession, url: str, visi
 
     for attempt in range(max_retries):
         try:
-            async with session.get(url, timeout=aiohttp.ClientTimeout(total=30)) as response:
+            async with session.get(url) as response:
                 if response.status == 403:
                     logger.warning(f"Got 403 for {url} on attempt {attempt + 1}/{max_retries}")
                     if attempt < max_retries - 1:
@@ -630,7 +691,7 @@ async def extract_case_study_info(session: aiohttp.ClientSession, url: str, visi
                     return None
 
                 html = await response.text()
-                soup = BeautifulSoup(html, 'html.parser')
+                soup = BeautifulSoup(html, 'lxml')
                 break  # Success, exit retry loop
 
         except aiohttp.ClientError as e:
@@ -674,28 +735,16 @@ async def extract_case_study_info(session: aiohttp.ClientSession, url: str, visi
                 if description:
                     break
 
-        # Determine type based on content
-        page_text = soup.get_text().lower()
-        case_type = "Case Study"
-        if 'success story' in page_text or 'customer story' in page_text:
-            case_type = "Success Story"
-        elif 'use case' in page_text:
-            case_type = "Use Case"
-        elif 'transformation' in page_text:
-            case_type = "Transformation Story"
-        elif 'solution' in page_text:
-            case_type = "Industry Solution"
-
-        # Extract category/industry
-        category = None
-        category_keywords = ['AI', 'Healthcare', 'Finance', 'Retail', 'Manufacturing', 'Technology', 'Education', 'E-commerce']
-        for keyword in category_keywords:
-            if keyword.lower() in page_text:
-                category = keyword
-                break
-
-        if not category:
-            category = "General"
+        # Determine type and category/industry from a single keyword scan of the page's headline content
+        page_keywords = find_page_keywords(get_page_signal_text(soup, description))
+        case_type = next(
+            (rule_type for phrases, rule_type in CASE_TYPE_RULES if any(phrase in page_keywords for phrase in phrases)),
+            "Case Study"
+        )
+        category = next(
+            (keyword for keyword in CATEGORY_KEYWORDS if keyword.lower() in page_keywords),
+            "General"
+        )
 
         # Extract tags
         tags = []
@@ -705,16 +754,13 @@ async def extract_case_study_info(session: aiohttp.ClientSession, url: str, visi
             if tag_text and len(tag_text) < 30:
                 tags.append(tag_text)
 
-        # Find PDF download link
+        # Find PDF download link (first link whose href mentions pdf or download, any case)
         pdf_url = None
-        pdf_links = soup.find_all('a', href=True)
-        for link in pdf_links:
-            href = link.get('href', '')
-            if href.endswith('.pdf') or 'download' in href.lower() or 'pdf' in href.lower():
-                pdf_url = href
-                if not pdf_url.startswith('http'):
-                    pdf_url = urljoin(url, pdf_url)
-                break
+        pdf_link = soup.select_one('a[href*="pdf" i], a[href*="download" i]')
+        if pdf_link:
+            pdf_url = pdf_link['href']
+            if not pdf_url.startswith('http'):
+                pdf_url = urljoin(url, pdf_url)
 
         # Extract filename from PDF URL
         filename = None
@@ -738,6 +784,12 @@ async def extract_case_study_info(session: aiohttp.ClientSession, url: str, visi
         logger.error(f"Error extracting case study from {url}: {str(e)}")
         return None
 
+# Maximum case study pages fetched at once while crawling
+CRAWL_CONCURRENCY = 10
+
+# PDF downloads run in their own worker pool, fed from the page extraction stage
+PDF_DOWNLOAD_WORKERS = 4
+
 async def crawl_zuci_case_studies() -> List[Dict[str, Any]]:
     """Crawl Zuci Systems case study page and extract all case studies"""
     base_url = "https://www.zucisystems.com/category/casestudy/"
@@ -768,22 +820,25 @@ async def crawl_zuci_case_studies() -> List[Dict[str, Any]]:
     }
 
     # Create connector without SSL verification (some corporate sites have cert issues)
-    connector = aiohttp.TCPConnector(ssl=False)
+    # Pooled keep-alive connections are reused across the concurrent case study fetches
+    connector = aiohttp.TCPConnector(ssl=False, limit=50, limit_per_host=10, ttl_dns_cache=300, keepalive_timeout=30)
 
     # Create cookie jar to maintain session
     cookie_jar = aiohttp.CookieJar()
 
-    async with aiohttp.ClientSession(headers=headers, connector=connector, cookie_jar=cookie_jar) as session:
+    async with aiohttp.ClientSession(headers=headers, connector=connector, cookie_jar=cookie_jar, timeout=PAGE_TIMEOUT) as session:
         try:
             # First, visit the homepage to establish session and cookies
             logger.info("Visiting homepage to establish session...")
             try:
-                async with session.get("https://www.zucisystems.com", timeout=aiohttp.ClientTimeout(total=20)) as home_response:
+                async with session.get("https://www.zucisystems.com", timeout=HOMEPAGE_TIMEOUT) as home_response:
                     if home_response.status == 200:
                         logger.info("Homepage visited successfully, session established")
-                    await asyncio.sleep(random.uniform(2, 4))  # Wait before going to case studies page
+                    # Only the cookies are needed; release the connection back to the pool
+                    home_response.release()
             except Exception as e:
                 logger.warning(f"Could not visit homepage: {str(e)}")
+            await asyncio.sleep(random.uniform(2, 4))  # Wait before going to case studies page
 
             # Add retry logic for the main page
             max_retries = 3
@@ -793,7 +848,7 @@ async def crawl_zuci_case_studies() -> List[Dict[str, Any]]:
                 try:
                     await asyncio.sleep(random.uniform(1, 3))  # Random delay before request
 
-                    async with session.get(base_url, timeout=aiohttp.ClientTimeout(total=30)) as response:
+                    async with session.get(base_url) as response:
                         if response.status == 403:
                             logger.warning(f"Got 403 on attempt {attempt + 1}/{max_retries}")
                             if attempt < max_retries - 1:
@@ -808,7 +863,7 @@ async def crawl_zuci_case_studies() -> List[Dict[str, Any]]:
                             return []
 
                         html = await response.text()
-                        soup = BeautifulSoup(html, 'html.parser')
+                        soup = BeautifulSoup(html, 'lxml')
                         break  # Success, exit retry loop
 
                 except aiohttp.ClientError as e:
@@ -846,27 +901,61 @@ async def crawl_zuci_case_studies() -> List[Dict[str, Any]]:
             case_study_links = list(set(case_study_links))
             logger.info(f"Found {len(case_study_links)} potential case study links")
 
-            # Extract info from each case study with delays between requests
-            for idx, link in enumerate(case_study_links[:20]):
-                # Add random delay between requests to avoid rate limiting
-                if idx > 0:
-                    delay = random.uniform(2, 5)
-                    logger.info(f"Waiting {delay:.1f}s before next request...")
-                    await asyncio.sleep(delay)
-
-                case_study_info = await extract_case_study_info(session, link, visited)
-                if case_study_info:
-                    if case_study_info.get('pdf_url') or case_study_info.get('description'):
-                        if case_study_info.get('pdf_url'):
-                            # Add delay before PDF download
-                            await asyncio.sleep(random.uniform(1, 3))
-                            pdf_content, pdf_size = await download_pdf(session, case_study_info['pdf_url'])
-                            if pdf_content:
-                                case_study_info['file_content'] = base64.b64encode(pdf_content).decode('utf-8')
-                                case_study_info['file_size'] = pdf_size
-
-                        case_studies.append(case_study_info)
-                        logger.info(f"Extracted: {case_study_info['title']}")
+            # Extract page info concurrently (bounded to avoid rate limiting) and hand PDF downloads
+            # to a separate pool of workers, so page fetches don't wait behind downloads
+            links = case_study_links[:20]
+            results: List[Optional[Dict[str, Any]]] = [None] * len(links)
+            sem = asyncio.BoundedSemaphore(CRAWL_CONCURRENCY)
+            pdf_queue: asyncio.Queue = asyncio.Queue(maxsize=50)
+
+            async def extract(idx: int, link: str):
+                async with sem:
+                    # Random jitter so concurrent requests don't arrive as a burst
+                    if idx > 0:
+                        await asyncio.sleep(random.uniform(0.5, 2))
+                    case_study_info = await extract_case_study_info(session, link, visited)
+
+                if not case_study_info:
+                    return
+                if not (case_study_info.get('pdf_url') or case_study_info.get('description')):
+                    return
+
+                results[idx] = case_study_info
+                if case_study_info.get('pdf_url'):
+                    await pdf_queue.put(case_study_info)
+                else:
+                    logger.info(f"Extracted: {case_study_info['title']}")
+
+            async def produce():
+                try:
+                    outcomes = await asyncio.gather(
+                        *(extract(idx, link) for idx, link in enumerate(links)),
+                        return_exceptions=True
+                    )
+                    for link, outcome in zip(links, outcomes):
+                        if isinstance(outcome, Exception):
+                            logger.error(f"Error processing {link}: {str(outcome)}")
+                finally:
+                    # One sentinel per download worker
+                    for _ in range(PDF_DOWNLOAD_WORKERS):
+                        await pdf_queue.put(None)
+
+            async def download_worker():
+                while True:
+                    case_study_info = await pdf_queue.get()
+                    if case_study_info is None:
+                        return
+                    try:
+                        pdf_base64, pdf_size = await download_pdf(session, case_study_info['pdf_url'])
+                        if pdf_base64:
+                            case_study_info['file_content'] = pdf_base64.decode('ascii')
+                            case_study_info['file_size'] = pdf_size
+                    except Exception as e:
+                        logger.error(f"Error downloading PDF for {case_study_info['source_url']}: {str(e)}")
+                    logger.info(f"Extracted: {case_study_info['title']}")
+
+            await asyncio.gather(produce(), *(download_worker() for _ in range(PDF_DOWNLOAD_WORKERS)))
+            case_studies.extend(info for info in results if info)
 
         except Exception as e:
             logger.error(f"Error crawling case studies: {str(e)}")
@@ -907,12 +996,38 @@ Keep it professional and focused on business value. Maximum 6 lines."""
         return f"{study.get('title', 'Case Study')}\n{study.get('category', 'General')} - {study.get('type', 'Case Study')}\n{study.get('description', '')[:200]}"
 
 @router.post("/document-files/scrape-zuci-case-studies")
-async def scrape_zuci_case_studies(current_user: User = Depends(get_current_user)):
-    """Scrape Zuci Systems website for case studies and save them to document files."""
+async def scrape_zuci_case_studies(in_process: bool = False, current_user: User = Depends(get_current_user)):
+    """
+    Scrape Zuci Systems website for case studies and save them to document files.
+    Runs the scraper in a separate worker process by default, since Playwright can't
+    launch its browser on the Selector event loop uvicorn uses with reload on Windows;
+    pass in_process=true to run it on the server's event loop and MongoDB client instead.
+    """
     import subprocess
     import json
     from pathlib import Path
 
+    if in_process:
+        from scraper_worker import run_scraper
+
+        logger.info(f"Running scraper in-process for user: {current_user.id}")
+        try:
+            result_json = await asyncio.wait_for(
+                run_scraper(current_user.id, db=db, case_study_manager=case_study_manager),
+                timeout=600
+            )
+        except asyncio.TimeoutError:
+            raise HTTPException(
+                status_code=500,
+                detail="Scraping timed out after 10 minutes. Please try again or contact administrator."
+            )
+        except Exception as e:
+            logger.error(f"Error in scrape endpoint: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Failed to scrape case studies: {str(e)}")
+
+        logger.info(f"Scraper completed: {result_json.get('message', 'No message')}")
+        return result_json
+
     try:
         logger.info("Starting Zuci case studies scraping in worker process...")
 
@@ -936,12 +1051,12 @@ async def scrape_zuci_case_studies(current_user: User = Depends(get_current_user
             cwd=str(worker_script.parent)
         )
 
-        # Wait for process to complete (with timeout)
+        # Wait for process to complete (with timeout) without blocking the event loop
         try:
-            stdout, stderr = process.communicate(timeout=600)  # 10 minutes timeout
+            stdout, stderr = await asyncio.to_thread(process.communicate, timeout=600)  # 10 minutes timeout
         except subprocess.TimeoutExpired:
             process.kill()
-            stdout, stderr = process.communicate()
+            stdout, stderr = await asyncio.to_thread(process.communicate)
             raise HTTPException(
                 status_code=500,
                 detail="Scraping timed out after 10 minutes. Please try again or contact administrator."
@@ -4,17 +4,18 @@ Contains: GTM models, validation, feedback processing, final prompt generation,
 """
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
+import asyncio
 import uuid
 from datetime import datetime, timezone
 import logging
-import json
-import re
+import orjson
 
 from login import User, get_current_user
 from gtm_agentdb import GTMAgentDB
 from gtm_conversation_db import get_conversation_db
 from groq_api import groq_client,generate_llm_response
+from gtm_helper import CONFIRMATION_REPLIES, JSON_OBJECT_RE
 logger = logging.getLogger(__name__)
 
 # Router
@@ -29,6 +30,7 @@ case_study_manager = None
 # Initialize AgentDB-based GTM Assistant (per-user instances stored in dict)
 gtm_agents = {}
 
+
 def set_db(database):
     global db
     db = database
@@ -45,11 +47,12 @@ def set_case_study_manager(manager):
     global case_study_manager
     case_study_manager = manager
 
-def get_or_create_gtm_agent(user_id: str) -> GTMAgentDB:
-    """Get or create GTM agent instance for user"""
-    if user_id not in gtm_agents:
-        gtm_agents[user_id] = GTMAgentDB()
-    return gtm_agents[user_id]
+def get_or_create_gtm_agent(user_id: str) -> Tuple[GTMAgentDB, bool]:
+    """Get or create GTM agent instance for user, returns (agent, created)"""
+    if user_id in gtm_agents:
+        return gtm_agents[user_id], False
+    gtm_agents[user_id] = GTMAgentDB()
+    return gtm_agents[user_id], True
 
 # ============== MODELS ==============
 
@@ -127,10 +130,10 @@ async def extract_information_with_llm_full_context(
     """
     Use LLM to intelligently extract information WITH FULL CONVERSATION CONTEXT
     """
-    conversation_text = "\n".join([
+    conversation_text = "\n".join(
         f"{msg['role'].upper()}: {msg['content']}"
         for msg in conversation_history[-10:]
-    ])
+    )
 
     extraction_prompt = f"""You are an INTELLIGENT AI assistant for extracting and organizing microsite content from natural language commands.
 
@@ -141,7 +144,7 @@ CURRENT USER MESSAGE:
 "{user_message}"
 
 ACCUMULATED CONTEXT SO FAR:
-{json.dumps(current_context, indent=2)}
+{orjson.dumps(current_context, option=orjson.OPT_INDENT_2).decode()}
 
 Your task is to INTELLIGENTLY understand user commands and extract structured information:
 
@@ -241,15 +244,30 @@ Output: {{"action": "remove", "target_section": "case_studies", "removal_targets
         )
         response = chat_completion.choices[0].message.content
 
-        json_match = re.search(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', response, re.DOTALL)
+        json_match = JSON_OBJECT_RE.search(response)
         print(json_match)
         if json_match:
-            return json.loads(json_match.group())
+            return orjson.loads(json_match.group())
     except Exception as e:
         logger.error(f"Extraction error: {str(e)}")
 
     return None
 
+async def find_case_studies_matching(search_conditions: List[Dict[str, Any]], limit: int = 5) -> List[Dict[str, Any]]:
+    """Fetch case studies from document_files matching any of the search conditions"""
+    if not search_conditions:
+        return []
+    return await db.document_files.find(
+        {"$or": search_conditions},
+        {"_id": 0, "id": 1, "filename": 1, "summary": 1, "category": 1, "metadata": 1}
+    ).limit(limit).to_list(limit)
+
+async def get_latest_zuci_news_items(max_results: int = 2) -> List[Dict[str, Any]]:
+    """Fetch latest Zuci news through the case study manager, if configured"""
+    if not case_study_manager:
+        return []
+    return await case_study_manager.get_latest_zuci_news(max_results=max_results)
+
 # ============== GTM ROUTES ==============
 
 @router.post("/gtm/validate", response_model=GTMValidationResponse)
@@ -318,7 +336,7 @@ async def process_gtm_feedback(request: GTMFeedbackRequest, current_user: User =
 
     conv_db = get_conversation_db()
     session_id = conv_db.get_or_create_active_session(current_user.id, form_data)
-    full_context = conv_db.get_full_context(session_id)
+    full_context = conv_db.get_full_context(session_id, message_limit=10)
     conversation_history = full_context.get('conversation_history', [])
 
     user_msg_id = conv_db.add_message(
@@ -333,27 +351,29 @@ async def process_gtm_feedback(request: GTMFeedbackRequest, current_user: User =
         'content': feedback
     })
 
-    agent = get_or_create_gtm_agent(current_user.id)
-
-    # Load previous section states from database
-    if full_context.get('section_states'):
-        for section_key, section_data in full_context['section_states'].items():
-            if section_key in agent.prompt_sections:
-                agent.prompt_sections[section_key].content = section_data.get('content', '')
-                agent.prompt_sections[section_key].subsections = section_data.get('subsections', {})
-
-    # Load extracted entities from database
-    if full_context.get('extracted_entities'):
-        for entity in full_context['extracted_entities']:
-            entity_type = entity.get('entity_type')
-            entity_data = entity.get('entity_data', {})
-
-            if entity_type in agent.extracted_entities:
-                if isinstance(agent.extracted_entities[entity_type], list):
-                    if entity_data not in agent.extracted_entities[entity_type]:
-                        agent.extracted_entities[entity_type].append(entity_data)
-                elif isinstance(agent.extracted_entities[entity_type], dict):
-                    agent.extracted_entities[entity_type].update(entity_data)
+    agent, agent_created = get_or_create_gtm_agent(current_user.id)
+
+    # A warm agent already holds this state in memory; only restore on cold start
+    if agent_created:
+        # Load previous section states from database
+        if full_context.get('section_states'):
+            for section_key, section_data in full_context['section_states'].items():
+                if section_key in agent.prompt_sections:
+                    agent.prompt_sections[section_key].content = section_data.get('content', '')
+                    agent.prompt_sections[section_key].subsections = section_data.get('subsections', {})
+
+        # Load extracted entities from database
+        if full_context.get('extracted_entities'):
+            for entity in full_context['extracted_entities']:
+                entity_type = entity.get('entity_type')
+                entity_data = entity.get('entity_data', {})
+
+                if entity_type in agent.extracted_entities:
+                    if isinstance(agent.extracted_entities[entity_type], list):
+                        if entity_data not in agent.extracted_entities[entity_type]:
+                            agent.extracted_entities[entity_type].append(entity_data)
+                    elif isinstance(agent.extracted_entities[entity_type], dict):
+                        agent.extracted_entities[entity_type].update(entity_data)
 
     extraction_result = await extract_information_with_llm_full_context(
         user_message=feedback,
@@ -411,6 +431,9 @@ async def process_gtm_feedback(request: GTMFeedbackRequest, current_user: User =
     if result.get("should_regenerate"):
         logger.info(f"Generating final prompt for session {session_id} with full context")
 
+        # Only the latest messages were loaded for extraction; the final prompt needs all of them
+        conversation_history = conv_db.get_conversation_history(session_id)
+
         offering_keywords = form_data.get('offering', '').lower()
         industry = form_data.get('industry', '').lower()
 
@@ -429,54 +452,51 @@ async def process_gtm_feedback(request: GTMFeedbackRequest, current_user: User =
             search_conditions.append({"category": {"$regex": term, "$options": "i"}})
             search_conditions.append({"filename": {"$regex": term, "$options": "i"}})
 
-        fetched_case_studies = []
-        if search_conditions:
-            case_studies_cursor = db.document_files.find(
-                {"$or": search_conditions},
-                {"_id": 0, "id": 1, "filename": 1, "summary": 1, "category": 1, "metadata": 1}
-            ).limit(5)
-            fetched_case_studies = await case_studies_cursor.to_list(5)
+        # Case studies and latest Zuci news are independent, fetch them concurrently
+        fetched_case_studies, zuci_news_items = await asyncio.gather(
+            find_case_studies_matching(search_conditions),
+            get_latest_zuci_news_items(max_results=2)
+        )
 
         logger.info(f"Found {len(fetched_case_studies)} case studies for {industry}")
 
-        # Fetch latest Zuci news
         zuci_news_text = ""
-        if case_study_manager:
-            zuci_news_items = await case_study_manager.get_latest_zuci_news(max_results=2)
-            if zuci_news_items:
-                zuci_news_text = "\n\n## 📰 Latest Company News\n"
-                zuci_news_text += "**Include these recent achievements to build credibility:**\n\n"
-                for idx, news in enumerate(zuci_news_items, 1):
-                    news_link = news.get('news_link', '')
-                    zuci_news_text += f"### {idx}. {news.get('title', 'News Update')}\n"
-                    zuci_news_text += f"- **Description**: {news.get('description', '')}\n"
-                    zuci_news_text += f"- **Published**: {news.get('published_date', '')}\n"
-                    if news_link:
-                        zuci_news_text += f"- **Link**: {news_link}\n"
-                        zuci_news_text += f"- **Markdown Format**: [{news.get('title', 'News')}]({news_link})\n"
-                    zuci_news_text += "\n"
-                zuci_news_text += "**INSTRUCTION**: Include at least one news item naturally in the microsite (preferably in the credibility/about section or footer) with a clickable link.\n"
-                logger.info(f"Added {len(zuci_news_items)} Zuci news items to GTM prompt")
-
-        final_prompt_text = agent.build_final_prompt(
+        if zuci_news_items:
+            zuci_news_text = "\n\n## 📰 Latest Company News\n"
+            zuci_news_text += "**Include these recent achievements to build credibility:**\n\n"
+            for idx, news in enumerate(zuci_news_items, 1):
+                news_link = news.get('news_link', '')
+                zuci_news_text += f"### {idx}. {news.get('title', 'News Update')}\n"
+                zuci_news_text += f"- **Description**: {news.get('description', '')}\n"
+                zuci_news_text += f"- **Published**: {news.get('published_date', '')}\n"
+                if news_link:
+                    zuci_news_text += f"- **Link**: {news_link}\n"
+                    zuci_news_text += f"- **Markdown Format**: [{news.get('title', 'News')}]({news_link})\n"
+                zuci_news_text += "\n"
+            zuci_news_text += "**INSTRUCTION**: Include at least one news item naturally in the microsite (preferably in the credibility/about section or footer) with a clickable link.\n"
+            logger.info(f"Added {len(zuci_news_items)} Zuci news items to GTM prompt")
+
+        prompt_parts = [agent.build_final_prompt(
             form_data=form_data,
             validation_result=validation,
             case_studies=fetched_case_studies
-        )
+        )]
 
         # Append zuci_news to final prompt
         if zuci_news_text:
-            final_prompt_text += zuci_news_text
+            prompt_parts.append(zuci_news_text)
 
-        user_adjustments = []
-        for msg in conversation_history:
-            if msg['role'] == 'user' and msg['content'] not in ['1', '2', '3', 'yes', 'generate', 'go ahead']:
-                user_adjustments.append(msg['content'])
+        user_adjustments = [
+            msg['content'] for msg in conversation_history
+            if msg['role'] == 'user' and msg['content'] not in CONFIRMATION_REPLIES
+        ]
 
-        user_adjustments_text = "\n\n".join([f"- {adj}" for adj in user_adjustments if len(adj) > 10])
+        user_adjustments_text = "\n\n".join(f"- {adj}" for adj in user_adjustments if len(adj) > 10)
 
         if user_adjustments_text:
-            final_prompt_text += f"\n\n## 💬 User-Provided Context & Requirements\n\n{user_adjustments_text}\n"
+            prompt_parts.append(f"\n\n## 💬 User-Provided Context & Requirements\n\n{user_adjustments_text}\n")
+
+        final_prompt_text = "".join(prompt_parts)
 
         gtm_id = str(uuid.uuid4())
         gtm_record = {
@@ -578,7 +598,7 @@ async def generate_final_gtm_prompt(request: GTMFinalPromptRequest, current_user
 
     user_adjustments_list = []
     for msg in conversation_history:
-        if msg['role'] == 'user' and msg['content'] not in ['1', '2', '3', 'yes', 'generate', 'go ahead']:
+        if msg['role'] == 'user' and msg['content'] not in CONFIRMATION_REPLIES:
             user_adjustments_list.append(msg['content'])
 
     if user_adjustments or user_adjustments_list:
@@ -229,6 +229,39 @@ class GTMConversationDB:
         
         return messages
     
+    def get_recent_conversation_history(self, session_id: str, limit: int) -> List[Dict]:
+        """Get the latest `limit` messages for session, oldest first"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT * FROM conversations 
+            WHERE session_id = ?
+            ORDER BY timestamp DESC
+            LIMIT ?
+        """, (session_id, limit))
+        rows = cursor.fetchall()
+        
+        messages = []
+        for row in reversed(rows):
+            msg = dict(row)
+            # Parse JSON fields
+            if msg.get('extraction_data'):
+                msg['extraction_data'] = json.loads(msg['extraction_data'])
+            if msg.get('section_updates'):
+                msg['section_updates'] = json.loads(msg['section_updates'])
+            messages.append(msg)
+        
+        return messages
+    
+    def count_messages(self, session_id: str) -> int:
+        """Count messages stored for session"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT COUNT(*) FROM conversations WHERE session_id = ?", (session_id,))
+        return cursor.fetchone()[0]
+    
     def update_accumulated_context(self, session_id: str, context: Dict):
         """Update accumulated context for session"""
         conn = self.get_connection()
@@ -327,13 +360,21 @@ class GTMConversationDB:
         
         conn.commit()
     
-    def get_full_context(self, session_id: str) -> Dict:
-        """Get complete context for session including all history"""
+    def get_full_context(self, session_id: str, message_limit: Optional[int] = None) -> Dict:
+        """
+        Get complete context for session including history
+        When message_limit is set only the latest messages are loaded
+        """
         session = self.get_session(session_id)
         if not session:
             return {}
         
-        conversation_history = self.get_conversation_history(session_id)
+        if message_limit:
+            conversation_history = self.get_recent_conversation_history(session_id, message_limit)
+            message_count = self.count_messages(session_id)
+        else:
+            conversation_history = self.get_conversation_history(session_id)
+            message_count = len(conversation_history)
         extracted_entities = self.get_extracted_entities(session_id)
         
         # Parse JSON fields from session
@@ -349,7 +390,7 @@ class GTMConversationDB:
             'accumulated_context': accumulated_context,
             'section_states': section_states,
             'extracted_entities': extracted_entities,
-            'message_count': len(conversation_history),
+            'message_count': message_count,
             'status': session['status']
         }
     
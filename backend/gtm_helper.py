@@ -8,6 +8,12 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# Short confirmation replies that are not treated as user adjustments
+CONFIRMATION_REPLIES = frozenset({'1', '2', '3', 'yes', 'generate', 'go ahead'})
+
+# Matches a JSON object with at most one level of nesting in LLM output
+JSON_OBJECT_RE = re.compile(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', re.DOTALL)
+
 async def extract_information_with_llm(user_message: str, current_context: Dict) -> Optional[Dict]:
     """
     Use LLM to intelligently extract and classify information from user messages
@@ -92,7 +98,7 @@ Rules:
         response = chat_completion.choices[0].message.content
         
         # Extract JSON from response
-        json_match = re.search(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', response, re.DOTALL)
+        json_match = JSON_OBJECT_RE.search(response)
         if json_match:
             return json.loads(json_match.group())
     except Exception as e:
@@ -118,7 +124,7 @@ async def process_gtm_feedback(request: GTMFeedbackRequest, current_user: User =
     validation = request.validation_result
     
     # Get or create GTM agent for this user
-    agent = get_or_create_gtm_agent(current_user.id)
+    agent, _ = get_or_create_gtm_agent(current_user.id)
     
     # Create async-safe LLM extraction wrapper
     async def llm_extract_async(message: str, context: Dict):
@@ -0,0 +1,210 @@
+# LLM Prompt Cache - exact + semantic response cache
+# Reuses LLM results for repeated or near-duplicate requests
+
+import asyncio
+import hashlib
+import logging
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def canonicalize(text: str) -> str:
+    """Lowercase and collapse whitespace so formatting-only differences share a key"""
+    return _WHITESPACE_RE.sub(' ', text or '').strip().lower()
+
+
+class SemanticPromptCache:
+    """
+    Two-layer cache for LLM results
+
+    1. Exact layer: in-memory LRU keyed by SHA-256 of the canonical request,
+       backed by a MongoDB collection with a TTL index so entries survive restarts
+    2. Semantic layer: clusters of embedded requests per context (e.g. user +
+       tone + case studies); a new request whose embedding is within
+       `similarity_threshold` (cosine) of a cluster centroid reuses that cluster's response
+
+    The semantic layer is off unless `semantic` is set and an embedding function
+    is given: near-duplicate threads that differ only in names, amounts or dates
+    would otherwise receive each other's generated text.
+    Entries in every layer expire after `ttl_seconds`.
+    """
+
+    def __init__(
+        self,
+        collection=None,
+        embedding_function: Optional[Callable[[str], Optional[np.ndarray]]] = None,
+        similarity_threshold: float = 0.95,
+        max_entries: int = 1024,
+        ttl_seconds: int = 24 * 60 * 60,
+        semantic: bool = False
+    ):
+        """
+        Args:
+            collection: MongoDB collection for persistence (optional)
+            embedding_function: Sync text -> vector function (optional)
+            similarity_threshold: Minimum cosine similarity for a semantic hit
+            semantic: Enable the semantic layer (exact matches only by default)
+            max_entries: Maximum entries kept in the in-memory exact layer
+            ttl_seconds: Lifetime of persisted entries
+        """
+        self.collection = collection
+        self.embedding_function = embedding_function
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.semantic = semantic and embedding_function is not None
+
+        # {key: (expires_at, response)}, expiry on the time.monotonic() clock
+        self._exact: OrderedDict = OrderedDict()
+        # {context_key: [{"centroid": ndarray, "count": int, "response": dict, "expires_at": float}]}
+        self._clusters: Dict[str, List[Dict[str, Any]]] = {}
+
+    async def ensure_indexes(self):
+        """Create the TTL index on the persistence collection"""
+        if self.collection is None:
+            return
+        await self.collection.create_index("created_at", expireAfterSeconds=self.ttl_seconds)
+
+    @staticmethod
+    def make_key(text: str, context: str) -> str:
+        """SHA-256 of the canonical request text and its context"""
+        return hashlib.sha256(f"{context}\x00{canonicalize(text)}".encode('utf-8')).hexdigest()
+
+    async def get(self, text: str, context: str = "") -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached response
+
+        Args:
+            text: Free-form request text compared semantically (e.g. the email thread)
+            context: Parameters that must match exactly (user, tone, inputs, case study ids)
+
+        Returns:
+            Cached response dict or None on miss
+        """
+        key = self.make_key(text, context)
+
+        entry = self._exact.get(key)
+        if entry is not None:
+            expires_at, response = entry
+            if expires_at > time.monotonic():
+                self._exact.move_to_end(key)
+                logger.info("LLM cache exact hit")
+                return response
+            del self._exact[key]
+
+        if self.collection is not None:
+            try:
+                # The TTL monitor only runs periodically, so filter out expired entries too
+                cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.ttl_seconds)
+                doc = await self.collection.find_one(
+                    {"_id": key, "created_at": {"$gt": cutoff}},
+                    {"_id": 0, "response": 1, "created_at": 1}
+                )
+                if doc:
+                    created_at = doc['created_at']
+                    if created_at.tzinfo is None:
+                        created_at = created_at.replace(tzinfo=timezone.utc)
+                    remaining = self.ttl_seconds - (datetime.now(timezone.utc) - created_at).total_seconds()
+                    self._remember(key, doc['response'], remaining)
+                    logger.info("LLM cache persistent hit")
+                    return doc['response']
+            except Exception as e:
+                logger.error(f"LLM cache lookup failed: {e}")
+
+        clusters = self._live_clusters(context) if self.semantic else None
+        if clusters:
+            embedding = await self._embed(text)
+            if embedding is not None:
+                best = max(clusters, key=lambda c: self._cosine_similarity(embedding, c['centroid']))
+                similarity = self._cosine_similarity(embedding, best['centroid'])
+                if similarity >= self.similarity_threshold:
+                    logger.info(f"LLM cache semantic hit (similarity {similarity:.3f})")
+                    return best['response']
+
+        return None
+
+    async def set(self, text: str, response: Dict[str, Any], context: str = ""):
+        """Store a response for the request in every cache layer"""
+        key = self.make_key(text, context)
+        self._remember(key, response)
+
+        if self.semantic:
+            embedding = await self._embed(text)
+            if embedding is not None:
+                self._add_to_cluster(context, embedding, response)
+
+        if self.collection is not None:
+            try:
+                await self.collection.replace_one(
+                    {"_id": key},
+                    {"_id": key, "response": response, "created_at": datetime.now(timezone.utc)},
+                    upsert=True
+                )
+            except Exception as e:
+                logger.error(f"LLM cache persist failed: {e}")
+
+    def _remember(self, key: str, response: Dict[str, Any], ttl_seconds: Optional[float] = None):
+        """Insert into the in-memory LRU, evicting the oldest entry when full"""
+        if ttl_seconds is None:
+            ttl_seconds = self.ttl_seconds
+        self._exact[key] = (time.monotonic() + ttl_seconds, response)
+        self._exact.move_to_end(key)
+        if len(self._exact) > self.max_entries:
+            self._exact.popitem(last=False)
+
+    def _add_to_cluster(self, context: str, embedding: np.ndarray, response: Dict[str, Any]):
+        """Join the nearest cluster above threshold or start a new one"""
+        clusters = self._live_clusters(context)
+        self._clusters[context] = clusters
+        for cluster in clusters:
+            if self._cosine_similarity(embedding, cluster['centroid']) >= self.similarity_threshold:
+                count = cluster['count']
+                cluster['centroid'] = (cluster['centroid'] * count + embedding) / (count + 1)
+                cluster['count'] = count + 1
+                return
+        clusters.append({
+            "centroid": embedding,
+            "count": 1,
+            "response": response,
+            "expires_at": time.monotonic() + self.ttl_seconds
+        })
+        if len(clusters) > self.max_entries:
+            clusters.pop(0)
+
+    def _live_clusters(self, context: str) -> List[Dict[str, Any]]:
+        """Clusters for a context with expired ones dropped"""
+        now = time.monotonic()
+        clusters = [c for c in self._clusters.get(context, []) if c['expires_at'] > now]
+        if clusters:
+            self._clusters[context] = clusters
+        else:
+            self._clusters.pop(context, None)
+        return clusters
+
+    async def _embed(self, text: str) -> Optional[np.ndarray]:
+        """Embed canonical text off the event loop"""
+        if not self.embedding_function:
+            return None
+        try:
+            return await asyncio.to_thread(self.embedding_function, canonicalize(text))
+        except Exception as e:
+            logger.error(f"LLM cache embedding failed: {e}")
+            return None
+
+    @staticmethod
+    def _cosine_similarity(vec1: np.ndarray, vec2: np.ndarray) -> float:
+        """Cosine similarity between two vectors"""
+        norm1 = np.linalg.norm(vec1)
+        norm2 = np.linalg.norm(vec2)
+        if norm1 == 0 or norm2 == 0:
+            return 0.0
+        return float(np.dot(vec1, vec2) / (norm1 * norm2))
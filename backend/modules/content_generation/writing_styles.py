@@ -161,16 +161,21 @@ def get_message_length_config(length_key: str) -> dict:
     """Get message length configuration"""
     return MESSAGE_LENGTH_CONFIGS.get(length_key, MESSAGE_LENGTH_CONFIGS["100-200"])
 
+# Option lists for the style/length pickers, built once at import
+ALL_WRITING_STYLES = tuple(
+    {"key": key, "name": value["name"], "description": value["description"]}
+    for key, value in WRITING_STYLES.items()
+)
+
+ALL_MESSAGE_LENGTHS = tuple(
+    {"key": key, "name": value["name"]}
+    for key, value in MESSAGE_LENGTH_CONFIGS.items()
+)
+
 def get_all_writing_styles():
     """Get list of all available writing styles"""
-    return [
-        {"key": key, "name": value["name"], "description": value["description"]}
-        for key, value in WRITING_STYLES.items()
-    ]
+    return ALL_WRITING_STYLES
 
 def get_all_message_lengths():
     """Get list of all available message lengths"""
-    return [
-        {"key": key, "name": value["name"]}
-        for key, value in MESSAGE_LENGTH_CONFIGS.items()
-    ]
+    return ALL_MESSAGE_LENGTHS
@@ -1,20 +1,25 @@
 """
 Standalone Zuci Case Studies Scraper Worker
-Runs as a separate process to avoid uvicorn event loop issues
+Can be awaited in-process via run_scraper() or run as a separate process
+(python scraper_worker.py <user_id>) when event loop isolation is needed
 """
 import asyncio
+import hashlib
 import sys
 import json
 import logging
 from pathlib import Path
 from datetime import datetime, timezone
 import uuid
+from typing import Tuple
 
 # Add backend directory to path
 sys.path.insert(0, str(Path(__file__).parent))
 
 from document_management import crawl_zuci_with_playwright, PLAYWRIGHT_AVAILABLE
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReplaceOne
+from pymongo.errors import BulkWriteError, PyMongoError
 from dotenv import load_dotenv
 import os
 
@@ -25,12 +30,29 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-async def generate_case_study_summary(study: dict, groq_client) -> str:
-    """Generate a 5-6 line summary for a case study using LLM"""
+# Maximum case study summaries requested from the LLM at once
+SUMMARY_CONCURRENCY = 5
+
+def compute_content_hash(study: dict) -> str:
+    """SHA-256 of the source content a case study summary is generated from"""
+    # The crawler sets description=None when a page has no meta description or <p>
+    return hashlib.sha256(((study.get('title') or '') + (study.get('description') or '')).encode('utf-8')).hexdigest()
+
+
+def fallback_case_study_summary(study: dict) -> str:
+    """Title / category - type / description excerpt, used when the LLM summary fails"""
+    return f"{study.get('title') or 'Case Study'}\n{study.get('category') or 'General'} - {study.get('type') or 'Case Study'}\n{(study.get('description') or '')[:200]}"
+
+
+async def generate_case_study_summary(study: dict, groq_client) -> Tuple[str, bool]:
+    """
+    Generate a 5-6 line summary for a case study using LLM
+    Returns (summary, generated) - generated is False when the fallback text was used
+    """
     try:
         from groq import Groq
 
-        description = study.get('description', '')
+        description = study.get('description') or ''
         title = study.get('title', '')
         category = study.get('category', '')
         tags = ', '.join(study.get('tags', [])[:3])
@@ -51,7 +73,9 @@ Provide a clear, informative summary that explains:
 
 Keep it professional and focused on business value. Maximum 6 lines."""
 
-        chat_completion = groq_client.chat.completions.create(
+        # Groq client is synchronous - run it off the event loop so summaries can overlap
+        chat_completion = await asyncio.to_thread(
+            groq_client.chat.completions.create,
             messages=[
                 {"role": "system", "content": "You are a business analyst creating concise case study summaries."},
                 {"role": "user", "content": summary_prompt}
@@ -63,32 +87,41 @@ Keep it professional and focused on business value. Maximum 6 lines."""
         summary = chat_completion.choices[0].message.content
         lines = [line.strip() for line in summary.split('\n') if line.strip()]
         summary = '\n'.join(lines[:6])
-        return summary
+        return summary, True
     except Exception as e:
         logger.error(f"Error generating summary: {str(e)}")
-        return f"{study.get('title', 'Case Study')}\n{study.get('category', 'General')} - {study.get('type', 'Case Study')}\n{study.get('description', '')[:200]}"
+        return fallback_case_study_summary(study), False
 
 
-async def run_scraper(user_id: str):
-    """Main scraper function that runs independently"""
+async def run_scraper(user_id: str, db=None, groq_client=None, case_study_manager=None) -> dict:
+    """
+    Main scraper function
+    Reuses the caller's MongoDB database, Groq client and CaseStudyManager when given,
+    otherwise opens its own (standalone process mode)
+    """
 
     # Load environment
     load_dotenv(Path(__file__).parent / '.env')
 
     # Connect to MongoDB
-    mongo_url = os.environ['MONGO_URL']
-    client = AsyncIOMotorClient(mongo_url)
-    db = client[os.environ['DB_NAME']]
+    client = None
+    if db is None:
+        mongo_url = os.environ['MONGO_URL']
+        client = AsyncIOMotorClient(mongo_url)
+        db = client[os.environ['DB_NAME']]
 
     # Initialize Groq
-    from groq import Groq
-    GROQ_API_KEY = os.environ.get("GROQ_API_KEY")
-    groq_client = Groq(api_key=GROQ_API_KEY)
+    if groq_client is None:
+        from groq import Groq
+        GROQ_API_KEY = os.environ.get("GROQ_API_KEY")
+        groq_client = Groq(api_key=GROQ_API_KEY)
 
     # Initialize CaseStudyManager for vector database storage
-    from config.case_study_manager import CaseStudyManager
-    case_study_manager = CaseStudyManager(db, llm_function=None)
-    logger.info("✓ CaseStudyManager initialized for vector database storage")
+    # (loading the embedding model is blocking, so keep it off the event loop)
+    if case_study_manager is None:
+        from config.case_study_manager import CaseStudyManager
+        case_study_manager = await asyncio.to_thread(CaseStudyManager, db, llm_function=None)
+        logger.info("✓ CaseStudyManager initialized for vector database storage")
 
     result = {
         "success": False,
@@ -96,11 +129,12 @@ async def run_scraper(user_id: str):
         "total_found": 0,
         "total_saved": 0,
         "total_updated": 0,
+        "total_failed": 0,
         "case_studies": []
     }
 
     try:
-        logger.info("Starting Zuci case studies scraping in worker process...")
+        logger.info("Starting Zuci case studies scraping...")
 
         if not PLAYWRIGHT_AVAILABLE:
             result["message"] = "Playwright not installed. Run: pip install playwright && playwright install"
@@ -118,16 +152,62 @@ async def run_scraper(user_id: str):
         saved_studies = []
         updated_studies = []
 
-        # Process each case study
-        logger.info(f"🤖 Generating AI summaries for {len(case_studies)} case studies...")
-
-        for idx, study in enumerate(case_studies, 1):
+        # Look up which case study files already exist in one query
+        filenames = [
+            study.get('filename', f"{study['title'][:50].replace(' ', '_')}.pdf")
+            for study in case_studies
+        ]
+        existing = {
+            doc['filename']: doc
+            async for doc in db.document_files.find(
+                {"filename": {"$in": filenames}},
+                {"_id": 0, "id": 1, "filename": 1, "content_hash": 1, "summary": 1}
+            )
+        }
+        content_hashes = [compute_content_hash(study) for study in case_studies]
+
+        # Generate summaries concurrently, bounded to respect LLM rate limits;
+        # unchanged case studies reuse their stored summary instead of calling the LLM
+        summary_sem = asyncio.Semaphore(SUMMARY_CONCURRENCY)
+
+        def stored_summary(study: dict, filename: str, content_hash: str):
+            stored = existing.get(filename, {})
+            if stored.get('content_hash') != content_hash:
+                return None
+            # Older runs hashed fallback summaries too; don't keep reusing those
+            summary = stored.get('summary')
+            if not summary or summary == fallback_case_study_summary(study):
+                return None
+            return summary
+
+        async def bounded_summary(study: dict, filename: str, content_hash: str) -> Tuple[str, bool]:
+            summary = stored_summary(study, filename, content_hash)
+            if summary is not None:
+                return summary, True
+            # One study's failure must not fail the whole gather (and with it the scrape run)
             try:
-                filename = study.get('filename', f"{study['title'][:50].replace(' ', '_')}.pdf")
+                async with summary_sem:
+                    return await generate_case_study_summary(study, groq_client)
+            except Exception as e:
+                logger.error(f"Error summarizing case study {study.get('title')}: {str(e)}")
+                return fallback_case_study_summary(study), False
 
-                logger.info(f"[{idx}/{len(case_studies)}] 🤖 Generating summary for: {study['title'][:60]}...")
-                summary = await generate_case_study_summary(study, groq_client)
-                logger.info(f"[{idx}/{len(case_studies)}] ✓ Summary generated")
+        reused = sum(
+            1 for study, filename, content_hash in zip(case_studies, filenames, content_hashes)
+            if stored_summary(study, filename, content_hash) is not None
+        )
+        logger.info(f"🤖 Generating AI summaries for {len(case_studies) - reused} case studies ({reused} unchanged)...")
+        summaries = await asyncio.gather(*(
+            bounded_summary(study, filename, content_hash)
+            for study, filename, content_hash in zip(case_studies, filenames, content_hashes)
+        ))
+        logger.info(f"✓ Prepared {len(summaries)} summaries")
+
+        # Process each case study, collecting writes for a single bulk_write
+        now = datetime.now(timezone.utc).isoformat()  # One timestamp for the whole scrape run
+        pending = {}  # filename -> (doc_file, study, action), last study's content wins on duplicate filenames
+        for study, filename, content_hash, (summary, summarized) in zip(case_studies, filenames, content_hashes, summaries):
+            try:
 
                 doc_file = {
                     "id": str(uuid.uuid4()),
@@ -138,9 +218,11 @@ async def run_scraper(user_id: str):
                     "file_size": study.get('file_size', 0),
                     "mime_type": "application/pdf",
                     "summary": summary,
+                    # Only LLM summaries are reusable; leave fallbacks unhashed so the next scrape retries
+                    "content_hash": content_hash if summarized else None,
                     "uploaded_by": user_id,
-                    "created_at": datetime.now(timezone.utc).isoformat(),
-                    "updated_at": datetime.now(timezone.utc).isoformat(),
+                    "created_at": now,
+                    "updated_at": now,
                     "metadata": {
                         "source": "zuci_systems",
                         "source_url": study.get('source_url'),
@@ -151,97 +233,94 @@ async def run_scraper(user_id: str):
                 }
 
                 if doc_file['file_content']:
-                    existing_doc = await db.document_files.find_one(
-                        {"filename": filename},
-                        {"_id": 0, "id": 1}
-                    )
-
-                    if existing_doc:
-                        doc_file['id'] = existing_doc['id']
-                        doc_file['updated_at'] = datetime.now(timezone.utc).isoformat()
-
-                        await db.document_files.replace_one(
-                            {"id": existing_doc['id']},
-                            doc_file
-                        )
-                        logger.info(f"[{idx}/{len(case_studies)}] 💾 Updated in DB: {filename[:40]}")
-
-                        # Store/update in vector database for semantic search
-                        try:
-                            case_study_manager.store_in_vector_db(
-                                file_id=doc_file['id'],
-                                file_url=study.get('source_url', ''),
-                                title=study['title'],
-                                summary=summary,
-                                category=doc_file['category']
-                            )
-                            logger.info(f"✓ Embeddings stored/updated for: {filename}")
-                        except Exception as e:
-                            logger.error(f"Failed to store embeddings for {filename}: {e}")
-
-                        updated_studies.append({
-                            "id": doc_file['id'],
-                            "title": study['title'],
-                            "category": doc_file['category'],
-                            "type": doc_file['doc_type'],
-                            "source_url": study.get('source_url'),
-                            "pdf_url": study.get('pdf_url'),
-                            "filename": doc_file['filename'],
-                            "tags": study.get('tags', []),
-                            "summary": summary,
-                            "action": "updated"
-                        })
+                    if filename in pending:
+                        # Keep the first occurrence's id and action; a file first created in this
+                        # run is still "created", not "updated", when a duplicate replaces it
+                        logger.warning(f"Duplicate filename in scrape results, keeping latest: {filename}")
+                        first_doc, _, action = pending[filename]
+                        doc_file['id'] = first_doc['id']
+                    elif filename in existing:
+                        doc_file['id'] = existing[filename]['id']
+                        action = "updated"
                     else:
-                        await db.document_files.insert_one(doc_file)
-                        logger.info(f"[{idx}/{len(case_studies)}] 💾 Created new in DB: {filename[:40]}")
-
-                        # Store in vector database for semantic search
-                        try:
-                            case_study_manager.store_in_vector_db(
-                                file_id=doc_file['id'],
-                                file_url=study.get('source_url', ''),
-                                title=study['title'],
-                                summary=summary,
-                                category=doc_file['category']
-                            )
-                            logger.info(f"✓ Embeddings stored for: {filename}")
-                        except Exception as e:
-                            logger.error(f"Failed to store embeddings for {filename}: {e}")
-
-                        saved_studies.append({
-                            "id": doc_file['id'],
-                            "title": study['title'],
-                            "category": doc_file['category'],
-                            "type": doc_file['doc_type'],
-                            "source_url": study.get('source_url'),
-                            "pdf_url": study.get('pdf_url'),
-                            "filename": doc_file['filename'],
-                            "tags": study.get('tags', []),
-                            "summary": summary,
-                            "action": "created"
-                        })
+                        action = "created"
+                    pending[filename] = (doc_file, study, action)
 
             except Exception as e:
                 logger.error(f"Error saving case study {study.get('title')}: {str(e)}")
                 continue
 
+        # Write all case studies in one round trip
+        entries = list(pending.values())
+        failed = set()
+        if entries:
+            try:
+                await db.document_files.bulk_write(
+                    [ReplaceOne({"filename": doc_file['filename']}, doc_file, upsert=True) for doc_file, _, _ in entries],
+                    ordered=False
+                )
+            except BulkWriteError as e:
+                failed = {err['index'] for err in e.details.get('writeErrors', [])}
+                logger.error(f"Failed to save {len(failed)} of {len(entries)} case studies: {e.details.get('writeErrors')}")
+            except PyMongoError as e:
+                # Network errors/timeouts: nothing is known to be saved, but still report the run
+                failed = set(range(len(entries)))
+                logger.error(f"Failed to save case studies: {e}")
+            logger.info(f"💾 Saved {len(entries) - len(failed)} case studies to DB")
+
+        for index, (doc_file, study, action) in enumerate(entries):
+            if index in failed:
+                continue
+            filename = doc_file['filename']
+
+            # Store/update in vector database for semantic search
+            try:
+                await asyncio.to_thread(
+                    case_study_manager.store_in_vector_db,
+                    file_id=doc_file['id'],
+                    file_url=study.get('source_url', ''),
+                    title=study['title'],
+                    summary=doc_file['summary'],
+                    category=doc_file['category']
+                )
+                logger.info(f"✓ Embeddings stored for: {filename}")
+            except Exception as e:
+                logger.error(f"Failed to store embeddings for {filename}: {e}")
+
+            (updated_studies if action == "updated" else saved_studies).append({
+                "id": doc_file['id'],
+                "title": study['title'],
+                "category": doc_file['category'],
+                "type": doc_file['doc_type'],
+                "source_url": study.get('source_url'),
+                "pdf_url": study.get('pdf_url'),
+                "filename": filename,
+                "tags": study.get('tags', []),
+                "summary": doc_file['summary'],
+                "action": action
+            })
+
         all_studies = saved_studies + updated_studies
 
         # Log vector database statistics
         vector_db_count = 0
         if case_study_manager.vector_db:
             try:
-                all_vector_studies = case_study_manager.vector_db.get_all_case_studies()
+                all_vector_studies = await asyncio.to_thread(case_study_manager.vector_db.get_all_case_studies)
                 vector_db_count = len(all_vector_studies)
                 logger.info(f"✓ Vector database now contains {vector_db_count} case studies for semantic search")
             except Exception as e:
                 logger.error(f"Error getting vector DB stats: {e}")
 
+        message = f"Successfully processed {len(all_studies)} case studies ({len(saved_studies)} new, {len(updated_studies)} updated). Vector DB: {vector_db_count} embeddings stored."
+        if failed:
+            message += f" {len(failed)} case studies could not be saved."
         result.update({
             "success": True,
-            "message": f"Successfully processed {len(all_studies)} case studies ({len(saved_studies)} new, {len(updated_studies)} updated). Vector DB: {vector_db_count} embeddings stored.",
+            "message": message,
             "total_saved": len(saved_studies),
             "total_updated": len(updated_studies),
+            "total_failed": len(failed),
             "vector_db_count": vector_db_count,
             "case_studies": all_studies
         })
@@ -252,7 +331,8 @@ async def run_scraper(user_id: str):
         traceback.print_exc()
         result["message"] = f"Failed to scrape case studies: {str(e)}"
     finally:
-        client.close()
+        if client is not None:
+            client.close()
 
     return result
 
@@ -12,6 +12,7 @@ if platform.system() == 'Windows':
     asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
 
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from starlette.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 from motor.motor_asyncio import AsyncIOMotorClient
@@ -22,6 +23,7 @@ from pathlib import Path
 
 from config.tone_config import get_system_prompt, get_email_structure_validation, format_email_output
 from config.case_study_manager import CaseStudyManager
+from llm_cache import SemanticPromptCache
 
 # Import all route modules
 import login
@@ -56,7 +58,12 @@ load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+# Bounded pool with a few warm connections so bursts of requests don't pay connection setup
+client = AsyncIOMotorClient(
+    mongo_url,
+    maxPoolSize=int(os.environ.get('MONGO_MAX_POOL_SIZE', 32)),
+    minPoolSize=int(os.environ.get('MONGO_MIN_POOL_SIZE', 4))
+)
 db = client[os.environ['DB_NAME']]
 
 # LLM Config
@@ -65,7 +72,7 @@ GROQ_API_KEY = os.environ.get("GROQ_API_KEY")
 groq_client = Groq(api_key=GROQ_API_KEY, http_client=httpx.Client(verify=False))
 
 # Initialize FastAPI app
-app = FastAPI(title="SalesPro API", version="2.0")
+app = FastAPI(title="SalesPro API", version="2.0", default_response_class=ORJSONResponse)
 
 # Initialize Case Study Manager
 case_study_manager = None
@@ -135,6 +142,68 @@ async def generate_llm_response(prompt: str, system_message: str = None, module:
         raise e
         raise HTTPException(status_code=500, detail="Error generating AI response")
 
+def _stream_until_json_closes(messages: list) -> str:
+    """
+    Stream a completion and stop reading as soon as the first top-level JSON object closes
+    Tracks brace depth outside of string literals; returns everything received so far
+    """
+    stream = groq_client.chat.completions.create(
+        messages=messages,
+        model="llama-3.3-70b-versatile",
+        stream=True,
+    )
+    parts = []
+    depth = 0
+    started = in_string = escaped = False
+    try:
+        for chunk in stream:
+            piece = chunk.choices[0].delta.content if chunk.choices else None
+            if not piece:
+                continue
+            parts.append(piece)
+            for ch in piece:
+                if in_string:
+                    if escaped:
+                        escaped = False
+                    elif ch == '\\':
+                        escaped = True
+                    elif ch == '"':
+                        in_string = False
+                elif ch == '{':
+                    depth += 1
+                    started = True
+                elif not started:
+                    continue
+                elif ch == '"':
+                    in_string = True
+                elif ch == '}':
+                    depth -= 1
+                    if depth == 0:
+                        return "".join(parts)
+        return "".join(parts)
+    finally:
+        # Drop the connection so the server stops generating the unread tail
+        stream.close()
+
+async def generate_llm_response_stream(prompt: str, system_message: str = None, module: str = None) -> str:
+    """
+    Generate an LLM response whose output is a single JSON object
+    Streams the completion and returns as soon as the object is complete, skipping any trailing text
+    """
+    if system_message is None:
+        system_message = get_system_prompt(module) if module else SALES_AGENT_SYSTEM_PROMPT
+
+    messages = [
+        {"role": "system", "content": system_message},
+        {"role": "user", "content": prompt}
+    ]
+    try:
+        # Groq client is synchronous - read the stream off the event loop
+        return await asyncio.to_thread(_stream_until_json_closes, messages)
+    except Exception as e:
+        logging.error(f"LLM Error: {str(e)}")
+        raise e
+
 # ============== STARTUP EVENT ==============
 
 @app.on_event("startup")
@@ -157,12 +226,34 @@ async def startup_event():
     content_management.set_db(db)
     microsite.set_db(db)
 
+    # Create MongoDB indexes, separately per module so one failure doesn't skip the rest
+    try:
+        await thread_intelligence.create_indexes()
+    except Exception as e:
+        logger.error(f"Error creating thread intelligence indexes: {e}")
+
+    try:
+        await zuci_news.create_indexes()
+    except Exception as e:
+        logger.error(f"Error creating Zuci news indexes: {e}")
+
+    try:
+        await document_management.create_indexes()
+    except Exception as e:
+        logger.error(f"Error creating document management indexes: {e}")
+
+    try:
+        await zuci_news.migrate_published_dates()
+    except Exception as e:
+        logger.error(f"Error migrating Zuci news published dates: {e}")
+
     # Set LLM helper for modules that need it
     agent_builder.set_llm_helper(generate_llm_response)
     campaign.set_llm_helper(generate_llm_response)
     gtm.set_llm_helper(generate_llm_response)
     personalize.set_llm_helper(generate_llm_response)
     thread_intelligence.set_llm_helper(generate_llm_response)
+    thread_intelligence.set_llm_stream_helper(generate_llm_response_stream)
     document_management.set_llm_helper(generate_llm_response)
     microsite.set_llm_helper(generate_llm_response)
 
@@ -184,6 +275,25 @@ async def startup_event():
     except Exception as e:
         logger.error(f"Error during vector DB sync: {e}")
 
+    # Initialize LLM response cache for thread analysis (exact matches only unless
+    # LLM_CACHE_SEMANTIC is set; the semantic layer reuses the case study embedding model)
+    embedding_function = None
+    if case_study_manager.vector_db and case_study_manager.vector_db.embedding_model:
+        embedding_function = case_study_manager.vector_db.generate_embedding
+    llm_cache = SemanticPromptCache(
+        db.llm_cache,
+        embedding_function=embedding_function,
+        semantic=os.environ.get('LLM_CACHE_SEMANTIC', '').lower() in ('1', 'true', 'yes')
+    )
+    try:
+        await llm_cache.ensure_indexes()
+    except Exception as e:
+        logger.error(f"Error creating LLM cache indexes: {e}")
+    thread_intelligence.set_llm_cache(llm_cache)
+
+    # Start batched writer for thread analysis history
+    thread_intelligence.start_thread_analysis_writer()
+
     # Set ROOT_DIR for documents module
     documents.set_root_dir(ROOT_DIR)
 
@@ -209,6 +319,7 @@ async def startup_event():
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await thread_intelligence.stop_thread_analysis_writer()
     client.close()
 
 # ============== INCLUDE ALL ROUTERS ==============
@@ -2,7 +2,9 @@
 # This includes conversation history storage and full context passing to LLM
 
 # Add these imports at the top of server.py
+import orjson
 from gtm_conversation_db import get_conversation_db, GTMConversationDB
+from gtm_helper import CONFIRMATION_REPLIES, JSON_OBJECT_RE
 
 # Add this helper function before GTM routes (around line 1900)
 
@@ -17,10 +19,10 @@ async def extract_information_with_llm_full_context(
     """
     
     # Format conversation history for LLM
-    conversation_text = "\n".join([
+    conversation_text = "\n".join(
         f"{msg['role'].upper()}: {msg['content']}"
         for msg in conversation_history[-10:]  # Last 10 messages for context
-    ])
+    )
     
     extraction_prompt = f"""You are an expert at extracting structured information from conversational text for a microsite builder.
 
@@ -31,7 +33,7 @@ CURRENT USER MESSAGE:
 "{user_message}"
 
 ACCUMULATED CONTEXT SO FAR:
-{json.dumps(current_context, indent=2)}
+{orjson.dumps(current_context, option=orjson.OPT_INDENT_2).decode()}
 
 Your task:
 1. Consider the ENTIRE conversation context, not just the current message
@@ -101,9 +103,9 @@ Rules:
         response = chat_completion.choices[0].message.content
         
         # Extract JSON from response
-        json_match = re.search(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', response, re.DOTALL)
+        json_match = JSON_OBJECT_RE.search(response)
         if json_match:
-            return json.loads(json_match.group())
+            return orjson.loads(json_match.group())
     except Exception as e:
         logger.error(f"Extraction error: {str(e)}")
     
@@ -132,7 +134,7 @@ async def process_gtm_feedback(request: GTMFeedbackRequest, current_user: User =
     session_id = conv_db.get_or_create_active_session(current_user.id, form_data)
     
     # Get full conversation context
-    full_context = conv_db.get_full_context(session_id)
+    full_context = conv_db.get_full_context(session_id, message_limit=10)
     conversation_history = full_context.get('conversation_history', [])
     
     # Add user message to database
@@ -150,28 +152,30 @@ async def process_gtm_feedback(request: GTMFeedbackRequest, current_user: User =
     })
     
     # Get or create GTM agent for this user
-    agent = get_or_create_gtm_agent(current_user.id)
+    agent, agent_created = get_or_create_gtm_agent(current_user.id)
     
-    # Load previous section states from database
-    if full_context.get('section_states'):
-        # Restore agent sections from database
-        for section_key, section_data in full_context['section_states'].items():
-            if section_key in agent.prompt_sections:
-                agent.prompt_sections[section_key].content = section_data.get('content', '')
-                agent.prompt_sections[section_key].subsections = section_data.get('subsections', {})
-    
-    # Load extracted entities from database
-    if full_context.get('extracted_entities'):
-        for entity in full_context['extracted_entities']:
-            entity_type = entity.get('entity_type')
-            entity_data = entity.get('entity_data', {})
-            
-            if entity_type in agent.extracted_entities:
-                if isinstance(agent.extracted_entities[entity_type], list):
-                    if entity_data not in agent.extracted_entities[entity_type]:
-                        agent.extracted_entities[entity_type].append(entity_data)
-                elif isinstance(agent.extracted_entities[entity_type], dict):
-                    agent.extracted_entities[entity_type].update(entity_data)
+    # A warm agent already holds this state in memory; only restore on cold start
+    if agent_created:
+        # Load previous section states from database
+        if full_context.get('section_states'):
+            # Restore agent sections from database
+            for section_key, section_data in full_context['section_states'].items():
+                if section_key in agent.prompt_sections:
+                    agent.prompt_sections[section_key].content = section_data.get('content', '')
+                    agent.prompt_sections[section_key].subsections = section_data.get('subsections', {})
+        
+        # Load extracted entities from database
+        if full_context.get('extracted_entities'):
+            for entity in full_context['extracted_entities']:
+                entity_type = entity.get('entity_type')
+                entity_data = entity.get('entity_data', {})
+                
+                if entity_type in agent.extracted_entities:
+                    if isinstance(agent.extracted_entities[entity_type], list):
+                        if entity_data not in agent.extracted_entities[entity_type]:
+                            agent.extracted_entities[entity_type].append(entity_data)
+                    elif isinstance(agent.extracted_entities[entity_type], dict):
+                        agent.extracted_entities[entity_type].update(entity_data)
     
     # Extract information using LLM with FULL CONVERSATION CONTEXT
     extraction_result = await extract_information_with_llm_full_context(
@@ -235,6 +239,9 @@ async def process_gtm_feedback(request: GTMFeedbackRequest, current_user: User =
     if result.get("should_regenerate"):
         logger.info(f"Generating final prompt for session {session_id} with full context")
         
+        # Only the latest messages were loaded for extraction; the final prompt needs all of them
+        conversation_history = conv_db.get_conversation_history(session_id)
+        
         # Fetch case studies from database
         offering_keywords = form_data.get('offering', '').lower()
         industry = form_data.get('industry', '').lower()
@@ -267,23 +274,25 @@ async def process_gtm_feedback(request: GTMFeedbackRequest, current_user: User =
         logger.info(f"Found {len(fetched_case_studies)} case studies for {industry}")
         
         # Build final prompt using agent with ALL accumulated sections
-        final_prompt_text = agent.build_final_prompt(
+        prompt_parts = [agent.build_final_prompt(
             form_data=form_data,
             validation_result=validation,
             case_studies=fetched_case_studies
-        )
+        )]
         
         # Create user adjustments summary from conversation history
-        user_adjustments = []
-        for msg in conversation_history:
-            if msg['role'] == 'user' and msg['content'] not in ['1', '2', '3', 'yes', 'generate', 'go ahead']:
-                user_adjustments.append(msg['content'])
+        user_adjustments = [
+            msg['content'] for msg in conversation_history
+            if msg['role'] == 'user' and msg['content'] not in CONFIRMATION_REPLIES
+        ]
         
-        user_adjustments_text = "\n\n".join([f"- {adj}" for adj in user_adjustments if len(adj) > 10])
+        user_adjustments_text = "\n\n".join(f"- {adj}" for adj in user_adjustments if len(adj) > 10)
         
         # Add user adjustments section to prompt if exists
         if user_adjustments_text:
-            final_prompt_text += f"\n\n## 💬 User-Provided Context & Requirements\n\n{user_adjustments_text}\n"
+            prompt_parts.append(f"\n\n## 💬 User-Provided Context & Requirements\n\n{user_adjustments_text}\n")
+        
+        final_prompt_text = "".join(prompt_parts)
         
         # Save to database with full context
         gtm_id = str(uuid.uuid4())
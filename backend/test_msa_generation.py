@@ -3,7 +3,10 @@ Test script for MSA document generation
 """
 
 import asyncio
+import hashlib
+import shutil
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 # Add parent directory to path
@@ -12,6 +15,41 @@ sys.path.insert(0, str(Path(__file__).parent))
 from mailmerge import MailMerge
 from datetime import datetime
 import base64
+import orjson
+
+# docx2pdf drives Word/LibreOffice, which only handles one conversion at a time;
+# a single worker process keeps it off the event loop and serialises calls
+_PDF_EXECUTOR = ProcessPoolExecutor(max_workers=1)
+
+PDF_CACHE_DIR = Path(__file__).parent / "test_output" / "pdf_cache"
+
+
+def _convert_docx_to_pdf(docx_path: str, pdf_path: str):
+    """Run docx2pdf conversion (executed in the worker process)"""
+    from docx2pdf import convert
+    convert(docx_path, pdf_path)
+
+
+async def convert_to_pdf_cached(template_path: Path, merge_data: dict, docx_path: Path, pdf_path: Path) -> bool:
+    """
+    Convert merged DOCX to PDF, reusing a cached PDF for the same template and merge data
+    Returns True when the PDF was served from cache
+    """
+    key = hashlib.blake2b(
+        template_path.read_bytes() + orjson.dumps(merge_data, option=orjson.OPT_SORT_KEYS)
+    ).hexdigest()
+    cached_pdf = PDF_CACHE_DIR / f"{key}.pdf"
+
+    if cached_pdf.exists():
+        shutil.copyfile(cached_pdf, pdf_path)
+        return True
+
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(_PDF_EXECUTOR, _convert_docx_to_pdf, str(docx_path), str(pdf_path))
+
+    PDF_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    shutil.copyfile(pdf_path, cached_pdf)
+    return False
 
 async def test_msa_generation():
     print("=" * 60)
@@ -55,11 +93,10 @@ async def test_msa_generation():
         
         # Try PDF conversion
         try:
-            from docx2pdf import convert
             pdf_path = output_path.with_suffix('.pdf')
             print(f"\n📑 Converting to PDF...")
-            convert(str(output_path), str(pdf_path))
-            print(f"✅ PDF generated successfully!")
+            from_cache = await convert_to_pdf_cached(template_path, test_data, output_path, pdf_path)
+            print(f"✅ PDF generated successfully!{' (cached)' if from_cache else ''}")
             print(f"   Location: {pdf_path}")
         except Exception as pdf_error:
             print(f"⚠️  PDF conversion failed: {pdf_error}")
@@ -77,6 +114,7 @@ async def test_msa_generation():
 
 if __name__ == "__main__":
     result = asyncio.run(test_msa_generation())
+    _PDF_EXECUTOR.shutdown()
     print("\n" + "=" * 60)
     if result:
         print("✅ All tests passed!")
@@ -2,49 +2,105 @@
 Test script for Zuci case studies scraper
 """
 import asyncio
+from typing import Dict, List, Optional
+
 import aiohttp
 from bs4 import BeautifulSoup
 
+# Shared session so repeated polls reuse the same connection pool
+_SESSION: Optional[aiohttp.ClientSession] = None
+
+# Per-URL validators from the last 200 response: {url: {'etag', 'last_modified', 'links'}}
+_PAGE_CACHE: Dict[str, Dict] = {}
+
+
+def get_session() -> aiohttp.ClientSession:
+    """Get or lazily create the shared HTTP session"""
+    global _SESSION
+    if _SESSION is None or _SESSION.closed:
+        _SESSION = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=20))
+    return _SESSION
+
+
+async def close_session():
+    """Close the shared HTTP session"""
+    global _SESSION
+    if _SESSION is not None and not _SESSION.closed:
+        await _SESSION.close()
+    _SESSION = None
+
+
+async def fetch_case_study_links(url: str) -> Optional[List[str]]:
+    """
+    Fetch case study links from a listing page
+    Sends If-None-Match / If-Modified-Since and reuses the cached links on 304
+    """
+    headers = {}
+    cached = _PAGE_CACHE.get(url)
+    if cached:
+        if cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+        if cached.get('last_modified'):
+            headers['If-Modified-Since'] = cached['last_modified']
+
+    async with get_session().get(url, headers=headers) as response:
+        print(f"Status: {response.status}")
+
+        if response.status == 304 and cached:
+            print("Page not modified, using cached links")
+            return cached['links']
+
+        if response.status != 200:
+            print("Failed to fetch page")
+            return None
+
+        html = await response.text()
+        soup = BeautifulSoup(html, 'lxml')
+
+        print(f"\nPage title: {soup.find('title').get_text() if soup.find('title') else 'No title'}")
+
+        # Find all links
+        all_links = soup.find_all('a', href=True)
+        print(f"\nTotal links found: {len(all_links)}")
+
+        # Filter case study links
+        case_study_links = []
+        for link in all_links:
+            href = link.get('href')
+            if any(keyword in href.lower() for keyword in ['case', 'study', 'success', 'story']):
+                if href.startswith('/'):
+                    href = f"https://www.zucisystems.com{href}"
+                if 'zucisystems.com' in href:
+                    case_study_links.append(href)
+
+        case_study_links = list(set(case_study_links))
+
+        _PAGE_CACHE[url] = {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'links': case_study_links
+        }
+        return case_study_links
+
+
 async def test_scrape():
     base_url = "https://www.zucisystems.com/category/casestudy/"
-    
-    async with aiohttp.ClientSession() as session:
-        try:
-            print(f"Fetching: {base_url}")
-            async with session.get(base_url, timeout=aiohttp.ClientTimeout(total=20)) as response:
-                print(f"Status: {response.status}")
-                
-                if response.status != 200:
-                    print("Failed to fetch page")
-                    return
-                
-                html = await response.text()
-                soup = BeautifulSoup(html, 'html.parser')
-                
-                print(f"\nPage title: {soup.find('title').get_text() if soup.find('title') else 'No title'}")
-                
-                # Find all links
-                all_links = soup.find_all('a', href=True)
-                print(f"\nTotal links found: {len(all_links)}")
-                
-                # Filter case study links
-                case_study_links = []
-                for link in all_links:
-                    href = link.get('href')
-                    if any(keyword in href.lower() for keyword in ['case', 'study', 'success', 'story']):
-                        if href.startswith('/'):
-                            href = f"https://www.zucisystems.com{href}"
-                        if 'zucisystems.com' in href:
-                            case_study_links.append(href)
-                
-                case_study_links = list(set(case_study_links))
-                print(f"\nCase study links found: {len(case_study_links)}")
-                
-                for i, link in enumerate(case_study_links[:5], 1):
-                    print(f"{i}. {link}")
-                
-        except Exception as e:
-            print(f"Error: {str(e)}")
+
+    try:
+        print(f"Fetching: {base_url}")
+        case_study_links = await fetch_case_study_links(base_url)
+        if case_study_links is None:
+            return
+
+        print(f"\nCase study links found: {len(case_study_links)}")
+
+        for i, link in enumerate(case_study_links[:5], 1):
+            print(f"{i}. {link}")
+
+    except Exception as e:
+        print(f"Error: {str(e)}")
+    finally:
+        await close_session()
 
 if __name__ == "__main__":
     asyncio.run(test_scrape())
@@ -1,6 +1,8 @@
 """
 Quick test for scraper worker
+Runs the scraper in-process by default; pass --subprocess to launch it as a separate process
 """
+import asyncio
 import subprocess
 import sys
 import json
@@ -8,11 +10,30 @@ from pathlib import Path
 
 worker_script = Path(__file__).parent / "scraper_worker.py"
 user_id = "test_user"
+use_subprocess = "--subprocess" in sys.argv[1:]
 
 print(f"Testing worker script: {worker_script}")
 print(f"User ID: {user_id}")
+print(f"Mode: {'subprocess' if use_subprocess else 'in-process'}")
 print("-" * 60)
 
+if not use_subprocess:
+    sys.path.insert(0, str(worker_script.parent))
+    from scraper_worker import run_scraper
+
+    print("Running scraper in-process, waiting for completion...")
+    print("This may take 3-5 minutes...\n")
+
+    try:
+        result = asyncio.run(asyncio.wait_for(run_scraper(user_id), timeout=600))
+        print("\n" + "=" * 60)
+        print("RESULT:")
+        print(json.dumps(result, indent=2))
+        print("=" * 60)
+    except asyncio.TimeoutError:
+        print("Timeout! Scraper did not finish within 10 minutes")
+    sys.exit(0)
+
 # Run the worker
 process = subprocess.Popen(
     [sys.executable, str(worker_script), user_id],
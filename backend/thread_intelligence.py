@@ -4,11 +4,16 @@ Contains: Thread analysis models and routes for analyzing email threads
 """
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Optional, List, Dict, Any, Tuple, Mapping, Literal
+import asyncio
 import uuid
+import itertools
 from datetime import datetime, timezone
 import logging
-import json
+import re
+import msgspec
+import bson
+from bson.raw_bson import RawBSONDocument
 
 from login import User, get_current_user
 
@@ -23,9 +28,25 @@ db = None
 # LLM helper reference - will be set from server.py
 generate_llm_response = None
 
+# Streaming LLM helper for JSON outputs (returns once the object closes) - will be set from server.py
+generate_llm_response_stream = None
+
 # Case study manager reference - will be set from server.py
 case_study_manager = None
 
+# LLM response cache for thread analyses - will be set from server.py
+llm_cache = None
+
+# Strong references to fire-and-forget tasks so they aren't garbage collected mid-flight
+_background_tasks: set = set()
+
+# Buffered thread_analyses writes - started from server.py, flushed in batches
+THREAD_WRITE_BATCH_SIZE = 100
+THREAD_WRITE_FLUSH_SECONDS = 1.0
+THREAD_WRITE_QUEUE_SIZE = 10000
+_write_queue: Optional[asyncio.Queue] = None
+_writer_task: Optional[asyncio.Task] = None
+
 # Tone descriptions for LLM prompts - consistent with Agent Builder and Personalization Assistant
 TONE_DESCRIPTIONS = {
     'professional': 'Formal, polished business communication. Respectful and direct.',
@@ -45,155 +66,14 @@ TONE_DESCRIPTIONS = {
     'concise': 'Brief, direct messaging. Clear value proposition in minimal words.',
 }
 
-def set_db(database):
-    global db
-    db = database
-
-def set_llm_helper(llm_func):
-    global generate_llm_response
-    generate_llm_response = llm_func
-
-def set_case_study_manager(manager):
-    global case_study_manager
-    case_study_manager = manager
-
-# ============== MODELS ==============
-
-class ThreadAnalyzeRequest(BaseModel):
-    thread_text: str
-    custom_inputs: str = ""
-    agent_id: Optional[str] = None
-    tone: str = "professional"  # All tone options from Agent Builder
-    selected_case_studies: List[str] = []
-    auto_pick_case_studies: bool = True
-
-class ThreadAnalysisResponse(BaseModel):
-    id: str
-    summary: str
-    detected_stage: str
-    sentiment: str
-    response: str
-    ai_followup: Optional[str] = None
-
-# ============== THREAD INTELLIGENCE ROUTES ==============
-
-@router.post("/thread/analyze", response_model=ThreadAnalysisResponse)
-async def analyze_thread(request: ThreadAnalyzeRequest, current_user: User = Depends(get_current_user)):
-    # Get tone description
-    tone_desc = TONE_DESCRIPTIONS.get(request.tone, TONE_DESCRIPTIONS['professional'])
-
-    # Get case studies - either auto-pick or use selected
-    case_study_text = ""
-    case_study_references = []
-
-    if case_study_manager:
-        if request.auto_pick_case_studies:
-            # Auto-pick based on thread context
-            logger.info("Attempting auto-pick case studies...")
-            case_study_ids = await case_study_manager.get_recommended_case_studies_for_thread(
-                thread_context=request.thread_text,
-                objection_type=None,
-                service=None
-            )
-
-            if case_study_ids:
-                case_studies = await case_study_manager.get_case_study_details(case_study_ids)
-                logger.info(f"Auto-pick found {len(case_studies)} case studies")
-                for cs in case_studies[:2]:
-                    source_url = cs.get('metadata', {}).get('source_url', '')
-                    logger.info(f"Processing case study: {cs.get('title')} - URL: {source_url}")
-                    # Only include case studies with valid URLs
-                    if source_url and source_url.strip():
-                        case_study_references.append({
-                            'title': cs.get('title', 'Case Study'),
-                            'url': source_url,
-                            'summary': cs.get('summary', '')[:200]
-                        })
-                        logger.info(f"Added case study: {cs.get('title')}")
-                    else:
-                        logger.warning(f"Skipping case study '{cs.get('title')}' - no valid source URL")
-            else:
-                logger.warning("Auto-pick found no matching case studies - trying to get any available case studies")
-
-            # Always try fallback if we don't have case studies yet
-            if not case_study_references:
-                # Fallback: Get any available case studies from document_files collection
-                try:
-                    # Query document_files collection (not documents)
-                    # Filter for documents with valid titles and summaries
-                    all_docs = await db.document_files.find({
-                        'title': {'$ne': 'Untitled'},
-                        'summary': {'$exists': True, '$ne': ''}
-                    }).limit(3).to_list(3)
-
-                    logger.info(f"Fallback found {len(all_docs)} case studies in database")
-                    for doc in all_docs:
-                        source_url = doc.get('metadata', {}).get('source_url', '')
-                        title = doc.get('title', 'Case Study')
-                        logger.info(f"Fallback processing: {title} - URL: {source_url}")
-                        if source_url and source_url.strip() and title and title != 'Untitled':
-                            case_study_references.append({
-                                'title': title,
-                                'url': source_url,
-                                'summary': doc.get('summary', '')[:200]
-                            })
-                            logger.info(f"Fallback added: {title}")
-                        else:
-                            logger.warning(f"Skipping case study '{title}' - no valid source URL or title")
-                except Exception as e:
-                    logger.error(f"Error in fallback case study fetch: {e}")
-                    import traceback
-                    logger.error(f"Traceback: {traceback.format_exc()}")
-
-        elif request.selected_case_studies:
-            # Use manually selected case studies
-            logger.info(f"Using {len(request.selected_case_studies)} manually selected case studies")
-            case_studies = await case_study_manager.get_case_study_details(request.selected_case_studies)
-            for cs in case_studies[:2]:
-                source_url = cs.get('metadata', {}).get('source_url', '')
-                logger.info(f"Processing case study: {cs.get('title')} - URL: {source_url}")
-                # Only include case studies with valid URLs
-                if source_url and source_url.strip():
-                    case_study_references.append({
-                        'title': cs.get('title', 'Case Study'),
-                        'url': source_url,
-                        'summary': cs.get('summary', '')[:200]
-                    })
-                    logger.info(f"Added case study: {cs.get('title')}")
-                else:
-                    logger.warning(f"Skipping case study '{cs.get('title')}' - no valid source URL")
-        else:
-            logger.info("No case studies selected (auto-pick disabled and no manual selection)")
-    else:
-        logger.error("case_study_manager is None - cannot fetch case studies")
-
-    # Build case study text for prompt
-    logger.info(f"Final case_study_references count: {len(case_study_references)}")
-    #print('case_study_references',case_study_references)
-
-    if case_study_references:
-        case_study_text = "\n=== AVAILABLE CASE STUDIES - USE THESE EXACT LINKS ===\n"
-        for idx, cs in enumerate(case_study_references, 1):
-           # print('case_study_text',case_study_text)
-            case_study_text += f"""
-Case Study {idx}:
-Title: {cs['title']}
-Summary: {cs['summary']}
-PDF URL: {cs['url']}
-How to include: [{cs['title']}]({cs['url']})
+# Pre-rendered "RESPONSE TONE" prompt lines per tone, built once at import
+TONE_BLOCKS = {
+    tone: f"Tone: {tone.upper()}\n        Style: {desc}"
+    for tone, desc in TONE_DESCRIPTIONS.items()
+}
 
-"""
-        case_study_text += """
-CRITICAL INSTRUCTIONS FOR CASE STUDY LINKS:
-1. You MUST use the EXACT PDF URLs provided above
-2. Do NOT create fake/placeholder URLs like "https://example.com/..."
-3. Do NOT make up case study links
-4. Copy the EXACT URL from the "PDF URL:" field above
-5. Format as markdown: [Exact Title from above](Exact URL from above)
-6. Include at least one case study link in your response
-"""
-    else:
-        case_study_text = """
+# Prompt text used when no case studies could be found for the thread
+NO_CASE_STUDIES_TEXT = """
 === NO CASE STUDIES AVAILABLE ===
 CRITICAL: There are NO case studies available for this thread.
 DO NOT create any case study links.
@@ -201,36 +81,13 @@ DO NOT mention case studies.
 DO NOT include any URLs like "https://example.com/..." or similar.
 Write your response WITHOUT any case study references.
 """
-        logger.warning("No case studies available - instructing LLM to skip case study references")
 
-    # Get latest Zuci news items
-    zuci_news_text = ""
-    if case_study_manager:
-        zuci_news_items = await case_study_manager.get_latest_zuci_news(max_results=2)
-        if zuci_news_items:
-            zuci_news_text = "\n=== LATEST ZUCI NEWS (MUST include in P.S. with link) ===\n"
-            for idx, news in enumerate(zuci_news_items, 1):
-                news_link = news.get('news_link', '')
-                zuci_news_text += f"""
-News {idx}:
-Title: {news.get('title', 'Zuci News')}
-Description: {news.get('description', '')}
-Published: {news.get('published_date', '')}
-Link: {news_link if news_link else 'No link available'}
-Markdown format: [{news.get('title', 'News')}]({news_link if news_link else '#'})
+# Sender signature; the prompt only asks for SIGNATURE_TOKEN, which is swapped for this after parsing
+SIGNATURE = "Best regards,\nTamil Bharathi\nManager - Growth\n+1 647 404 2503\nToronto, ON\nZuci Systems"
+SIGNATURE_TOKEN = "{SIGNATURE}"
 
-"""
-            zuci_news_text += """
-CRITICAL INSTRUCTION: You MUST reference at least ONE news item WITH clickable link in P.S.
-- Use markdown format: [News Title](exact_link_from_above)
-- Example: "P.S. Exciting news - we were recently [recognized as a Leader](link_from_above)."
-- If no link available, mention the news without link.
-"""
-            logger.info(f"Added {len(zuci_news_items)} Zuci news items to thread analysis")
-        else:
-            logger.info("No Zuci news items available for thread analysis")
-
-    prompt = f"""You are an email-thread analysis assistant. Follow ALL rules carefully.
+# Static pieces of the thread analysis prompt; analyze_thread joins them with the per-request fields
+THREAD_PROMPT_HEAD = """You are an email-thread analysis assistant. Follow ALL rules carefully.
 
         TASKS:
         1. Read and understand the entire email thread.
@@ -241,8 +98,9 @@ CRITICAL INSTRUCTION: You MUST reference at least ONE news item WITH clickable l
            - A professional response following the EMAIL-COPYWRITING STRUCTURE below
         
         === RESPONSE TONE (MANDATORY) ===
-        Tone: {request.tone.upper()}
-        Style: {tone_desc}
+        """
+
+THREAD_PROMPT_STRUCTURE = """
         
         === EMAIL-COPYWRITING STRUCTURE FOR RESPONSE ===
         1. HOOK: 1-2 sentences acknowledging the thread context
@@ -252,21 +110,17 @@ CRITICAL INSTRUCTION: You MUST reference at least ONE news item WITH clickable l
            - Format: "We recently helped [company] achieve [result]. See the details: [Use exact case study title](Use exact PDF URL)"
            - Lead with data/metrics where appropriate
         3. CTA: Clear, low-commitment next step
-        4. SIGNATURE: ALWAYS end with this exact signature:
+        4. SIGNATURE: ALWAYS end with the exact token {SIGNATURE} on its own line (it is replaced with the sender's signature)
+        """
 
-        Best regards,
-        Tamil Bharathi
-        Manager - Growth
-        +1 647 404 2503
-        Toronto, ON
-        Zuci Systems
-        {case_study_text}
-        {zuci_news_text}
+THREAD_PROMPT_RULES = """
 
         CRITICAL RULES:
         - Do NOT invent emails not present in the thread
         - Do NOT echo the user's draft message verbatim
-        - MUST follow the specified tone: {request.tone}
+        - MUST follow the specified tone: """
+
+THREAD_PROMPT_HARD_RULES = """
         - CASE STUDY RULE: Only include case study links if they appear in "AVAILABLE CASE STUDIES" section above
         - If "NO CASE STUDIES AVAILABLE" is shown above, DO NOT mention or create any case study links
         - NEVER create fake URLs like "https://example.com/case-study.pdf" or similar placeholders
@@ -290,20 +144,19 @@ CRITICAL INSTRUCTION: You MUST reference at least ONE news item WITH clickable l
         
         INPUT:
         Email Thread:
-        {request.thread_text}
-        
-        User Draft Message/Intent:
-        {request.custom_inputs}
+        """
+
+THREAD_PROMPT_TAIL = """
         
         OUTPUT FORMAT (STRICT JSON):
         Follow this EXACT format:
 
-        {{
+        {
           "summary": "<brief summary of the thread>",
           "stage": "Cold" | "Warm" | "Hot",
           "sentiment": "Positive" | "Neutral" | "Negative",
-          "response": "<professionally written response with proper email copywriting structure. Escape all line breaks as \\n and escape double quotes inside the text. Include a case study link only if provided in the input. MUST end with the signature: Best regards,\\nTamil Bharathi\\nManager - Growth\\n+1 647 404 2503\\nToronto, ON\\nZuci Systems>"
-        }}
+          "response": "<professionally written response with proper email copywriting structure. Escape all line breaks as \\n and escape double quotes inside the text. Include a case study link only if provided in the input. MUST end with \\n\\n{SIGNATURE}>"
+        }
         
         
          
@@ -319,60 +172,289 @@ CRITICAL INSTRUCTION: You MUST reference at least ONE news item WITH clickable l
         - Forces escaping  
         - Removes ANY ambiguity       """
 
-    # Log final analysis summary
-    if case_study_references:
-        logger.info(f"Analyzing thread with {len(case_study_references)} case studies:")
-        for cs in case_study_references:
-            logger.info(f"  - {cs['title']}: {cs['url']}")
-    else:
-        logger.warning("Analyzing thread with NO case studies - case_study_references is empty")
-        logger.warning(f"Auto-pick: {request.auto_pick_case_studies}, Selected: {request.selected_case_studies}")
+# Output format when an agent is selected: the follow-up email comes back in the same JSON
+THREAD_PROMPT_TAIL_WITH_FOLLOWUP = THREAD_PROMPT_TAIL.replace(
+    '{SIGNATURE}>"\n        }',
+    '{SIGNATURE}>",\n'
+    '          "followup": "<professional follow-up email (150-200 words) for the AGENT PROFILE above, '
+    'building on this analysis. Escape all line breaks as \\n and escape double quotes inside the text.>"\n'
+    '        }',
+    1
+)
+
+# Agent profile section, filled per request when an agent is selected
+THREAD_PROMPT_AGENT_PROFILE = """
+        
+        AGENT PROFILE (for the follow-up email):
+        - Service: {service}
+        - Tone: {tone}
+        """
+
+# Case study and news prompt sections; entries are %-formatted per request and joined once
+CASE_STUDIES_HEADER = "\n=== AVAILABLE CASE STUDIES - USE THESE EXACT LINKS ===\n"
 
-    logger.info(f"Tone: {request.tone}, Auto-pick: {request.auto_pick_case_studies}")
-    # print(prompt)
-    response_text = await  generate_llm_response(prompt)
-    logger.info(f"LLM response length: {len(response_text)} characters")
+CASE_STUDY_ENTRY_TEMPLATE = """
+Case Study %d:
+Title: %s
+Summary: %s
+PDF URL: %s
+How to include: [%s](%s)
+
+"""
+
+CASE_STUDIES_INSTRUCTIONS = """
+CRITICAL INSTRUCTIONS FOR CASE STUDY LINKS:
+1. You MUST use the EXACT PDF URLs provided above
+2. Do NOT create fake/placeholder URLs like "https://example.com/..."
+3. Do NOT make up case study links
+4. Copy the EXACT URL from the "PDF URL:" field above
+5. Format as markdown: [Exact Title from above](Exact URL from above)
+6. Include at least one case study link in your response
+"""
+
+ZUCI_NEWS_HEADER = "\n=== LATEST ZUCI NEWS (MUST include in P.S. with link) ===\n"
+
+ZUCI_NEWS_ENTRY_TEMPLATE = """
+News %d:
+Title: %s
+Description: %s
+Published: %s
+Link: %s
+Markdown format: [%s](%s)
+
+"""
+
+ZUCI_NEWS_INSTRUCTIONS = """
+CRITICAL INSTRUCTION: You MUST reference at least ONE news item WITH clickable link in P.S.
+- Use markdown format: [News Title](exact_link_from_above)
+- Example: "P.S. Exciting news - we were recently [recognized as a Leader](link_from_above)."
+- If no link available, mention the news without link.
+"""
+
+def set_db(database):
+    global db
+    db = database
+
+def set_llm_helper(llm_func):
+    global generate_llm_response
+    generate_llm_response = llm_func
+
+def set_llm_stream_helper(llm_func):
+    global generate_llm_response_stream
+    generate_llm_response_stream = llm_func
+
+def set_case_study_manager(manager):
+    global case_study_manager
+    case_study_manager = manager
+
+def set_llm_cache(cache):
+    global llm_cache
+    llm_cache = cache
+
+def start_thread_analysis_writer():
+    """Start the background task that batches thread_analyses inserts"""
+    global _write_queue, _writer_task
+    if _writer_task is not None and not _writer_task.done():
+        return
+    _write_queue = asyncio.Queue(maxsize=THREAD_WRITE_QUEUE_SIZE)
+    _writer_task = asyncio.create_task(_thread_analysis_writer(_write_queue))
+
+async def stop_thread_analysis_writer():
+    """Flush buffered thread analyses and stop the writer"""
+    global _write_queue, _writer_task
+    if _writer_task is None:
+        return
+    await _write_queue.put(None)
+    await _writer_task
+    _write_queue = None
+    _writer_task = None
+
+# Fallback case study filter; {'$gt': ''} means "non-empty string" and, unlike $ne/$nin,
+# is allowed in a partial index filter so the query below can use fallback_idx
+FALLBACK_CASE_STUDY_FILTER = {
+    'summary': {'$gt': ''},
+    'metadata.source_url': {'$gt': ''}
+}
+
+async def create_indexes():
+    """Create MongoDB indexes used by thread analysis queries"""
+    await db.document_files.create_index(
+        [('title', 1), ('summary', 1)],
+        partialFilterExpression=FALLBACK_CASE_STUDY_FILTER,
+        name='fallback_idx'
+    )
+
+# ============== MODELS ==============
+
+class ThreadAnalyzeRequest(BaseModel):
+    thread_text: str
+    custom_inputs: str = ""
+    agent_id: Optional[str] = None
+    tone: str = "professional"  # All tone options from Agent Builder
+    selected_case_studies: List[str] = []
+    auto_pick_case_studies: bool = True
+    regenerate: bool = False  # Skip the cached analysis and ask the LLM again
+
+class ThreadAnalysisResponse(BaseModel):
+    id: str
+    summary: str
+    detected_stage: str
+    sentiment: str
+    response: str
+    ai_followup: Optional[str] = None
+
+# Allowed values for the analysis stage and sentiment, mirrored by the LLMAnalysis Literal types
+THREAD_STAGES = ("Cold", "Warm", "Hot")
+THREAD_SENTIMENTS = ("Positive", "Neutral", "Negative")
+
+class LLMAnalysis(msgspec.Struct):
+    """Shape of the JSON object the thread analysis prompt asks the LLM for"""
+    summary: str
+    stage: Literal["Cold", "Warm", "Hot"]
+    sentiment: Literal["Positive", "Neutral", "Negative"]
+    response: str = ""
+    followup: str = ""
+
+# ============== HELPER FUNCTIONS ==============
+
+# Body of a ```json fence (to the closing fence, or the end of an unterminated one)
+FENCED_JSON_RE = re.compile(r"```json(.*?)(?:```|\Z)", re.DOTALL)
+
+# Fallback when there is no fence: the outermost raw {...}
+RAW_JSON_RE = re.compile(r"\{.*\}", re.DOTALL)
+
+# Invalid JSON escapes LLMs tend to emit (\' and \`), unescaped in a single pass
+INVALID_ESCAPE_RE = re.compile(r"\\(['`])")
+
+
+def iter_case_study_references(docs: List[Dict[str, Any]]):
+    """Yield prompt-ready references for case studies that have a source URL"""
+    for doc in docs:
+        source_url = ((doc.get('metadata') or {}).get('source_url') or '').strip()
+        if source_url:
+            yield {
+                'title': doc.get('title', 'Case Study'),
+                'url': source_url,
+                'summary': (doc.get('summary') or '')[:200]
+            }
+
+
+def build_case_study_references(docs: List[Dict[str, Any]], limit: int = 2) -> List[Dict[str, Any]]:
+    """First `limit` case studies with a valid source URL, as prompt references"""
+    return list(itertools.islice(iter_case_study_references(docs), limit))
+
+
+def apply_signature(text: str) -> str:
+    """Replace the signature token in an LLM response, appending the signature if it was left out"""
+    if SIGNATURE_TOKEN in text:
+        return text.replace(SIGNATURE_TOKEN, SIGNATURE)
+    if text and SIGNATURE not in text:
+        return f"{text.rstrip()}\n\n{SIGNATURE}"
+    return text
+
+
+async def _thread_analysis_writer(queue: asyncio.Queue):
+    """
+    Drain the write queue into insert_many batches
+    A batch is flushed at THREAD_WRITE_BATCH_SIZE docs or THREAD_WRITE_FLUSH_SECONDS
+    after its first doc, whichever comes first. A None item flushes and stops.
+    """
+    loop = asyncio.get_running_loop()
+    stopping = False
+    while not stopping:
+        doc = await queue.get()
+        if doc is None:
+            break
+
+        batch = [doc]
+        deadline = loop.time() + THREAD_WRITE_FLUSH_SECONDS
+        while len(batch) < THREAD_WRITE_BATCH_SIZE:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                doc = await asyncio.wait_for(queue.get(), timeout=timeout)
+            except asyncio.TimeoutError:
+                break
+            if doc is None:
+                stopping = True
+                break
+            batch.append(doc)
+
+        try:
+            await db.thread_analyses.insert_many(batch, ordered=False)
+        except Exception as e:
+            logger.error(f"Failed to save {len(batch)} thread analyses: {e}")
+
+
+async def save_thread_analysis(thread_doc: Mapping[str, Any]):
+    """Persist a thread analysis for history; failures are logged, not raised"""
+    try:
+        await db.thread_analyses.insert_one(thread_doc)
+    except Exception as e:
+        logger.error(f"Failed to save thread analysis {thread_doc.get('id')}: {e}")
+
+
+async def generate_thread_analysis(prompt: str) -> Tuple[Dict[str, Any], bool]:
+    """
+    Run the thread analysis prompt through the LLM and parse its JSON output
+    Returns (analysis, parsed) where parsed is False for fallback analyses
+    """
+    # The analysis is a single JSON object, so stop reading as soon as it closes when streaming is available
+    llm_func = generate_llm_response_stream or generate_llm_response
+    response_text = await llm_func(prompt)
+    logger.info("LLM response length: %d characters", len(response_text))
 
     if not response_text or not response_text.strip():
         logger.error("LLM returned empty response!")
         raise HTTPException(status_code=500, detail="Failed to generate analysis - empty response from AI")
 
     try:
-        # Extract JSON from response
-        # First, try to extract from ```json code block
-        if "```json" in response_text:
-            json_block = response_text.split("```json", 1)[1]
-            json_block = json_block.split("```", 1)[0].strip()
+        # Extract JSON from response, preferring a ```json code block over raw braces
+        match = FENCED_JSON_RE.search(response_text)
+        if match:
+            json_block = match.group(1).strip()
         else:
-            # fallback – extract raw braces
-            start = response_text.find("{")
-            end = response_text.rfind("}") + 1
-            if start != -1 and end > start:
-                json_block = response_text[start:end]
-            else:
+            match = RAW_JSON_RE.search(response_text)
+            if not match:
                 raise ValueError("No JSON object found in response")
+            json_block = match.group(0)
 
         # Clean the JSON string to fix common LLM escaping issues
-        # Replace invalid escape sequences
-        json_block = json_block.replace("\\'", "'")  # Fix invalid \' escape
-        json_block = json_block.replace("\\`", "`")  # Fix invalid \` escape
+        # Replace invalid \' and \` escape sequences
+        json_block = INVALID_ESCAPE_RE.sub(r"\1", json_block)
 
         # Log the cleaned JSON for debugging
-        logger.info(f"Cleaned JSON block length: {len(json_block)} characters")
-        print("Cleaned JSON block:")
+        logger.info("Cleaned JSON block length: %d characters", len(json_block))
         # print(json_block)
 
-        # Parse the JSON
-        analysis = json.loads(json_block)
+        # Parse and validate the JSON in one pass
+        analysis = msgspec.to_builtins(msgspec.json.decode(json_block.encode(), type=LLMAnalysis))
         logger.info("Successfully parsed JSON response")
 
         # Validate required fields
         if not analysis.get('response'):
             logger.warning("Response field is empty in parsed JSON")
-    except json.JSONDecodeError as e:
+        analysis['response'] = apply_signature(analysis['response'])
+        return analysis, True
+    except msgspec.ValidationError as e:
+        # Well-formed JSON with a missing field or out-of-range stage/sentiment:
+        # keep the text the LLM wrote and use neutral defaults for the rest
+        logger.warning("LLM analysis failed validation: %s", e)
+        raw = msgspec.json.decode(json_block.encode())
+        if not isinstance(raw, dict):
+            raw = {}
+        analysis = {
+            "summary": raw.get("summary") if isinstance(raw.get("summary"), str) else "Analysis completed but response validation failed",
+            "stage": raw.get("stage") if raw.get("stage") in THREAD_STAGES else "Warm",
+            "sentiment": raw.get("sentiment") if raw.get("sentiment") in THREAD_SENTIMENTS else "Neutral",
+            "response": apply_signature(raw["response"]) if isinstance(raw.get("response"), str) else "Unable to generate response",
+            "followup": raw.get("followup") if isinstance(raw.get("followup"), str) else ""
+        }
+    except msgspec.DecodeError as e:
         raise e
-        logger.error(f"JSON parsing error: {e}")
-        logger.error(f"Raw response: {response_text[:500]}")
+        logger.error("JSON parsing error: %s", e)
+        logger.error("Raw response: %s", response_text[:500])
         analysis = {
             "summary": "Analysis completed but response parsing failed",
             "stage": "Warm",
@@ -380,7 +462,7 @@ CRITICAL INSTRUCTION: You MUST reference at least ONE news item WITH clickable l
             "response": response_text[:500] if response_text else "Unable to generate response"
         }
     except Exception as e:
-        logger.error(f"Unexpected error in JSON parsing: {e}")
+        logger.error("Unexpected error in JSON parsing: %s", e)
         analysis = {
             "summary": "Error during analysis",
             "stage": "Warm",
@@ -388,46 +470,227 @@ CRITICAL INSTRUCTION: You MUST reference at least ONE news item WITH clickable l
             "response": "Unable to generate response due to error"
         }
 
-    # Generate follow-up if agent provided
-    followup = None
+    return analysis, False
+
+# ============== THREAD INTELLIGENCE ROUTES ==============
+
+@router.post("/thread/analyze", response_model=ThreadAnalysisResponse)
+async def analyze_thread(request: ThreadAnalyzeRequest, current_user: User = Depends(get_current_user)):
+    # Start lookups that don't depend on the case studies or the analysis so they overlap with them
+    lookup_tasks = []
+    agent_task = None
     if request.agent_id:
-        agent = await db.agents.find_one({"id": request.agent_id}, {"_id": 0})
+        agent_task = asyncio.create_task(db.agents.find_one({"id": request.agent_id}, {"_id": 0}))
+        lookup_tasks.append(agent_task)
+    zuci_news_task = None
+    if case_study_manager:
+        zuci_news_task = asyncio.create_task(case_study_manager.get_latest_zuci_news(max_results=2))
+        lookup_tasks.append(zuci_news_task)
+
+    try:
+        # Get tone block, unknown tones keep their name with the professional style
+        tone_block = TONE_BLOCKS.get(request.tone)
+        if tone_block is None:
+            tone_block = f"Tone: {request.tone.upper()}\n        Style: {TONE_DESCRIPTIONS['professional']}"
+
+        # Get case studies - either auto-pick or use selected
+        case_study_text = ""
+        case_study_references = []
+
+        if case_study_manager:
+            if request.auto_pick_case_studies:
+                # Fallback query runs alongside auto-pick and is only used if auto-pick yields nothing
+                fallback_task = asyncio.create_task(db.document_files.find(
+                    {'title': {'$ne': 'Untitled'}, **FALLBACK_CASE_STUDY_FILTER},
+                    {'_id': 0, 'title': 1, 'summary': 1, 'metadata.source_url': 1}
+                ).limit(3).to_list(length=3))
+                lookup_tasks.append(fallback_task)
+
+                # Auto-pick based on thread context
+                logger.info("Attempting auto-pick case studies...")
+                case_study_ids = await case_study_manager.get_recommended_case_studies_for_thread(
+                    thread_context=request.thread_text,
+                    objection_type=None,
+                    service=None
+                )
+
+                if case_study_ids:
+                    case_studies = await case_study_manager.get_case_study_details(case_study_ids)
+                    # Only include case studies with valid URLs
+                    case_study_references = build_case_study_references(case_studies)
+                    logger.info("Auto-pick found %d case studies, using %d with source URLs", len(case_studies), len(case_study_references))
+                else:
+                    logger.warning("Auto-pick found no matching case studies - trying to get any available case studies")
+
+                # Always try fallback if we don't have case studies yet
+                if not case_study_references:
+                    # Fallback: Get any available case studies from document_files collection
+                    try:
+                        # Query document_files collection (not documents)
+                        # Filter for documents with valid titles and summaries
+                        all_docs = await fallback_task
+
+                        case_study_references = build_case_study_references(all_docs, limit=3)
+                        logger.info("Fallback found %d case studies in database, using %d", len(all_docs), len(case_study_references))
+                    except Exception as e:
+                        logger.error("Error in fallback case study fetch: %s", e, exc_info=True)
+                else:
+                    fallback_task.cancel()
+
+            elif request.selected_case_studies:
+                # Use manually selected case studies
+                logger.info("Using %d manually selected case studies", len(request.selected_case_studies))
+                case_studies = await case_study_manager.get_case_study_details(request.selected_case_studies)
+                # Only include case studies with valid URLs
+                case_study_references = build_case_study_references(case_studies)
+                logger.info("Using %d of %d selected case studies with source URLs", len(case_study_references), len(case_studies))
+            else:
+                logger.info("No case studies selected (auto-pick disabled and no manual selection)")
+        else:
+            logger.error("case_study_manager is None - cannot fetch case studies")
+
+        # Build case study text for prompt
+        logger.info("Final case_study_references count: %d", len(case_study_references))
+        #print('case_study_references',case_study_references)
+
+        if case_study_references:
+            case_study_text = "".join((
+                CASE_STUDIES_HEADER,
+                *(
+                    CASE_STUDY_ENTRY_TEMPLATE % (idx, cs['title'], cs['summary'], cs['url'], cs['title'], cs['url'])
+                    for idx, cs in enumerate(case_study_references, 1)
+                ),
+                CASE_STUDIES_INSTRUCTIONS
+            ))
+        else:
+            case_study_text = NO_CASE_STUDIES_TEXT
+            logger.warning("No case studies available - instructing LLM to skip case study references")
+
+        # Get latest Zuci news items
+        zuci_news_text = ""
+        if zuci_news_task:
+            zuci_news_items = await zuci_news_task
+            if zuci_news_items:
+                news_entries = []
+                for idx, news in enumerate(zuci_news_items, 1):
+                    news_link = news.get('news_link', '')
+                    news_entries.append(ZUCI_NEWS_ENTRY_TEMPLATE % (
+                        idx,
+                        news.get('title', 'Zuci News'),
+                        news.get('description', ''),
+                        news.get('published_date', ''),
+                        news_link if news_link else 'No link available',
+                        news.get('title', 'News'),
+                        news_link if news_link else '#'
+                    ))
+                zuci_news_text = "".join((ZUCI_NEWS_HEADER, *news_entries, ZUCI_NEWS_INSTRUCTIONS))
+                logger.info("Added %d Zuci news items to thread analysis", len(zuci_news_items))
+            else:
+                logger.info("No Zuci news items available for thread analysis")
+
+        # With an agent selected, the follow-up email is requested in the same LLM call
+        agent = await agent_task if agent_task else None
+        if agent:
+            agent_text = THREAD_PROMPT_AGENT_PROFILE.format(service=agent.get('service', ''), tone=agent.get('tone', ''))
+            prompt_tail = THREAD_PROMPT_TAIL_WITH_FOLLOWUP
+        else:
+            agent_text = ""
+            prompt_tail = THREAD_PROMPT_TAIL
+
+        prompt = "".join((
+            THREAD_PROMPT_HEAD, tone_block,
+            THREAD_PROMPT_STRUCTURE, case_study_text, "\n        ", zuci_news_text,
+            THREAD_PROMPT_RULES, request.tone,
+            THREAD_PROMPT_HARD_RULES, request.thread_text,
+            "\n        \n        User Draft Message/Intent:\n        ", request.custom_inputs,
+            agent_text, prompt_tail
+        ))
+
+        # Log final analysis summary
+        if case_study_references:
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("Analyzing thread with %d case studies:", len(case_study_references))
+                for cs in case_study_references:
+                    logger.info("  - %s: %s", cs['title'], cs['url'])
+        else:
+            logger.warning("Analyzing thread with NO case studies - case_study_references is empty")
+            logger.warning("Auto-pick: %s, Selected: %s", request.auto_pick_case_studies, request.selected_case_studies)
+
+        logger.info("Tone: %s, Auto-pick: %s", request.tone, request.auto_pick_case_studies)
+        # print(prompt)
+        # Reuse this user's cached analysis for the same thread with the same settings
+        cache_context = "\x00".join([
+            current_user.id,
+            request.tone,
+            request.custom_inputs.strip(),
+            request.agent_id if agent else "",
+            *sorted(cs['url'] for cs in case_study_references)
+        ])
+        analysis = None
+        if llm_cache and not request.regenerate:
+            analysis = await llm_cache.get(request.thread_text, cache_context)
+
+        if analysis is None:
+            analysis, parsed = await generate_thread_analysis(prompt)
+            if llm_cache and parsed:
+                await llm_cache.set(request.thread_text, analysis, cache_context)
+
+        # Follow-up comes from the combined analysis; only fall back to a separate call if it's missing
+        followup = None
         if agent:
-            followup_prompt = f"""Based on this email thread analysis, generate a follow-up email:
+            followup = analysis.get('followup') or None
+            if followup is None:
+                followup_prompt = f"""Based on this email thread analysis, generate a follow-up email:
 
             Summary: {analysis['summary']}
             Stage: {analysis['stage']}
             Sentiment: {analysis['sentiment']}
 
             Agent Profile:
-            - Service: {agent['service']}
-            - Tone: {agent['tone']}
+            - Service: {agent.get('service', '')}
+            - Tone: {agent.get('tone', '')}
 
             Generate a professional follow-up email (150-200 words)."""
 
-            followup = await generate_llm_response(followup_prompt)
-
-    # Save analysis
-    thread_id = str(uuid.uuid4())
-    thread_doc = {
-        "id": thread_id,
-        "summary": analysis['summary'],
-        "detected_stage": analysis['stage'],
-        "sentiment": analysis['sentiment'],
-        "response": analysis.get("response"),
-        "ai_followup": followup,
-        "raw_thread_data": request.thread_text,
-        "created_by": current_user.id,
-        "created_at": datetime.now(timezone.utc).isoformat()
-    }
-
-    await db.thread_analyses.insert_one(thread_doc)
-
-    return ThreadAnalysisResponse(
-        id=thread_id,
-        summary=analysis['summary'],
-        detected_stage=analysis['stage'],
-        sentiment=analysis['sentiment'],
-        response=analysis.get('response', ''),
-        ai_followup=followup
-    )
+                followup = await generate_llm_response(followup_prompt)
+
+        # Save analysis
+        thread_id = str(uuid.uuid4())
+        thread_doc = {
+            "id": thread_id,
+            "summary": analysis['summary'],
+            "detected_stage": analysis['stage'],
+            "sentiment": analysis['sentiment'],
+            "response": analysis.get("response"),
+            "ai_followup": followup,
+            "raw_thread_data": request.thread_text,
+            "created_by": current_user.id,
+            "created_at": datetime.now(timezone.utc).isoformat()
+        }
+        # Encode to BSON once here; the driver sends raw documents as-is instead of re-encoding
+        # the dict (and the potentially large raw_thread_data) at write time
+        thread_doc = RawBSONDocument(bson.encode(thread_doc))
+
+        # Saved for history only and never read back here, so don't hold the response on it
+        if _write_queue is not None:
+            await _write_queue.put(thread_doc)
+        else:
+            save_task = asyncio.create_task(save_thread_analysis(thread_doc))
+            _background_tasks.add(save_task)
+            save_task.add_done_callback(_background_tasks.discard)
+
+        return ThreadAnalysisResponse(
+            id=thread_id,
+            summary=analysis['summary'],
+            detected_stage=analysis['stage'],
+            sentiment=analysis['sentiment'],
+            response=analysis.get('response', ''),
+            ai_followup=followup
+        )
+    finally:
+        # Don't leave lookups running, or their failures unretrieved, when the analysis raises
+        for task in lookup_tasks:
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled():
+                task.exception()
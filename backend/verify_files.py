@@ -33,12 +33,17 @@ def verify_files():
             print(f"  ❌ Folder does not exist!")
             continue
         
-        py_files = list(folder_path.glob("*.py"))
+        # Single directory read; DirEntry caches file type (and stat on Windows)
+        with os.scandir(folder_path) as it:
+            py_files = sorted(
+                (entry for entry in it if entry.name.endswith(".py") and entry.is_file()),
+                key=lambda entry: entry.name
+            )
         
-        for file in sorted(py_files):
-            size = file.stat().st_size
-            status = "✓" if size > 0 or file.name == "__init__.py" else "⚠"
-            print(f"  {status} {file.name} ({size:,} bytes)")
+        for entry in py_files:
+            size = entry.stat().st_size
+            status = "✓" if size > 0 or entry.name == "__init__.py" else "⚠"
+            print(f"  {status} {entry.name} ({size:,} bytes)")
             total_files += 1
             total_size += size
         
@@ -3,13 +3,16 @@ Zuci News Module
 Handles creation, retrieval, and management of Zuci company news
 """
 from fastapi import APIRouter, HTTPException, Depends
-from pydantic import BaseModel, Field
-from typing import List, Optional
+from pydantic import BaseModel, Field, field_serializer
+from typing import Any, Dict, List, Optional, Tuple, Union
 from datetime import datetime, timezone
 import uuid
+import time
+from pymongo import ReturnDocument
 import logging
 
 from login import User, get_current_user
+from config.date_utils import format_published_date
 
 logger = logging.getLogger(__name__)
 
@@ -19,39 +22,94 @@ router = APIRouter(prefix="/api", tags=["zuci-news"])
 # Database reference - will be set from server.py
 db = None
 
+# In-process cache for news reads: {key: (expires_at, value)}, cleared on any write
+NEWS_CACHE_TTL_SECONDS = 30
+_news_cache: Dict[Tuple, Tuple[float, Any]] = {}
+
 def set_db(database):
     global db
     db = database
 
+def _get_cached_news(key: Tuple) -> Optional[Any]:
+    """Return a cached read if it hasn't expired"""
+    entry = _news_cache.get(key)
+    if entry is None:
+        return None
+    expires_at, value = entry
+    if expires_at < time.monotonic():
+        _news_cache.pop(key, None)
+        return None
+    return value
+
+def _cache_news(key: Tuple, value: Any):
+    """Cache a read for NEWS_CACHE_TTL_SECONDS"""
+    _news_cache[key] = (time.monotonic() + NEWS_CACHE_TTL_SECONDS, value)
+
+def _invalidate_news_cache():
+    """Drop all cached reads after a create/update/delete"""
+    _news_cache.clear()
+
+async def create_indexes():
+    """Create MongoDB indexes used by Zuci news queries"""
+    # Listing and latest-news queries sort by published_date descending
+    await db.zuci_news.create_index([('published_date', -1)])
+    # Point lookups for get/update/delete
+    await db.zuci_news.create_index([('id', 1)], unique=True)
+
+async def migrate_published_dates():
+    """Convert legacy string published_date values to BSON dates so sorting is chronological"""
+    # Strings MongoDB can't parse are left unchanged rather than failing the whole update
+    result = await db.zuci_news.update_many(
+        {"published_date": {"$type": "string"}},
+        [{"$set": {"published_date": {"$convert": {
+            "input": "$published_date",
+            "to": "date",
+            "onError": "$published_date"
+        }}}}]
+    )
+    if result.modified_count:
+        logger.info(f"Converted published_date to BSON date on {result.modified_count} Zuci news entries")
+        _invalidate_news_cache()
+
 # ============== MODELS ==============
 
 class ZuciNewsCreate(BaseModel):
     title: str = Field(..., min_length=1, max_length=500)
     description: str = Field(..., min_length=1)
-    published_date: str  # ISO format date string
+    published_date: datetime  # ISO format date string, stored as a BSON date
     news_link: Optional[str] = None  # URL to the news article/announcement
 
 class ZuciNewsUpdate(BaseModel):
     title: Optional[str] = Field(None, min_length=1, max_length=500)
     description: Optional[str] = Field(None, min_length=1)
-    published_date: Optional[str] = None
+    published_date: Optional[datetime] = None
     news_link: Optional[str] = None
 
 class ZuciNews(BaseModel):
     id: str
     title: str
     description: str
-    published_date: str
+    # Legacy strings the migration couldn't parse are passed through unchanged
+    published_date: Union[datetime, str]
     news_link: Optional[str] = None
     created_by: str
     created_at: str
     updated_at: str
 
+    @field_serializer('published_date')
+    def serialize_published_date(self, value: Union[datetime, str]) -> str:
+        return format_published_date(value)
+
+# Fields returned by the ZuciNews response model
+ZUCI_NEWS_PROJECTION = {field: 1 for field in ZuciNews.model_fields}
+ZUCI_NEWS_PROJECTION["_id"] = 0
+
 # ============== ROUTES ==============
 
 @router.post("/zuci-news", response_model=ZuciNews)
 async def create_zuci_news(news_data: ZuciNewsCreate, current_user: User = Depends(get_current_user)):
     """Create a new Zuci news entry"""
+    now = datetime.now(timezone.utc).isoformat()
     news = {
         "id": str(uuid.uuid4()),
         "title": news_data.title,
@@ -59,33 +117,59 @@ async def create_zuci_news(news_data: ZuciNewsCreate, current_user: User = Depen
         "published_date": news_data.published_date,
         "news_link": news_data.news_link,
         "created_by": current_user.id,
-        "created_at": datetime.now(timezone.utc).isoformat(),
-        "updated_at": datetime.now(timezone.utc).isoformat()
+        "created_at": now,
+        "updated_at": now
     }
 
     await db.zuci_news.insert_one(news)
+    _invalidate_news_cache()
     logger.info(f"Created Zuci news: {news['title']}")
 
     return news
 
 @router.get("/zuci-news", response_model=List[ZuciNews])
-async def get_all_zuci_news(current_user: User = Depends(get_current_user)):
-    """Get all Zuci news entries, sorted by published_date descending"""
-    news_items = await db.zuci_news.find(
+async def get_all_zuci_news(
+    limit: Optional[int] = None,
+    skip: int = 0,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get Zuci news entries, sorted by published_date descending
+    Returns every entry unless limit is given (capped at 200 per page)
+    """
+    if limit is not None:
+        limit = max(1, min(limit, 200))
+    skip = max(skip, 0)
+    cache_key = ("list", limit, skip)
+    news_items = _get_cached_news(cache_key)
+    if news_items is not None:
+        return news_items
+
+    cursor = db.zuci_news.find(
         {},
-        {"_id": 0}
-    ).sort("published_date", -1).to_list(None)
+        ZUCI_NEWS_PROJECTION
+    ).sort("published_date", -1).skip(skip)
+    if limit is not None:
+        cursor = cursor.limit(limit)
+    news_items = await cursor.to_list(limit)
 
+    _cache_news(cache_key, news_items)
     return news_items
 
 @router.get("/zuci-news/{news_id}", response_model=ZuciNews)
 async def get_zuci_news(news_id: str, current_user: User = Depends(get_current_user)):
     """Get a specific Zuci news entry"""
+    cache_key = ("item", news_id)
+    news = _get_cached_news(cache_key)
+    if news is not None:
+        return news
+
     news = await db.zuci_news.find_one({"id": news_id}, {"_id": 0})
 
     if not news:
         raise HTTPException(status_code=404, detail="News not found")
 
+    _cache_news(cache_key, news)
     return news
 
 @router.put("/zuci-news/{news_id}", response_model=ZuciNews)
@@ -95,11 +179,6 @@ async def update_zuci_news(
     current_user: User = Depends(get_current_user)
 ):
     """Update a Zuci news entry"""
-    existing_news = await db.zuci_news.find_one({"id": news_id}, {"_id": 0})
-
-    if not existing_news:
-        raise HTTPException(status_code=404, detail="News not found")
-
     # Build update data
     update_data = {"updated_at": datetime.now(timezone.utc).isoformat()}
 
@@ -112,13 +191,18 @@ async def update_zuci_news(
     if news_data.news_link is not None:
         update_data["news_link"] = news_data.news_link
 
-    await db.zuci_news.update_one(
+    # Update and fetch the updated document in one round trip
+    updated_news = await db.zuci_news.find_one_and_update(
         {"id": news_id},
-        {"$set": update_data}
+        {"$set": update_data},
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
     )
 
-    # Fetch updated document
-    updated_news = await db.zuci_news.find_one({"id": news_id}, {"_id": 0})
+    if not updated_news:
+        raise HTTPException(status_code=404, detail="News not found")
+
+    _invalidate_news_cache()
     logger.info(f"Updated Zuci news: {updated_news['title']}")
 
     return updated_news
@@ -131,5 +215,7 @@ async def delete_zuci_news(news_id: str, current_user: User = Depends(get_curren
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="News not found")
 
+    _invalidate_news_cache()
+
     logger.info(f"Deleted Zuci news: {news_id}")
     return {"message": "News deleted successfully"}
@@ -1,26 +1,35 @@
 import struct
 import zlib
 
+# Precompiled packers for PNG chunk framing and the IHDR payload
+_U32 = struct.Struct('>I').pack
+IHDR_FMT = struct.Struct('>IIBBBBB')
+
+def chunk(tag, data):
+    """Frame a PNG chunk: length, tag, data, CRC of tag + data"""
+    return b''.join((_U32(len(data)), tag, data, _U32(zlib.crc32(data, zlib.crc32(tag)) & 0xffffffff)))
+
 def create_png(width, height, r, g, b):
     """Create a simple solid color PNG"""
-    def chunk(tag, data):
-        return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff)
     
     # PNG signature
     png = b'\x89PNG\r\n\x1a\n'
     
     # IHDR chunk
-    ihdr = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    ihdr = IHDR_FMT.pack(width, height, 8, 2, 0, 0, 0)
     png += chunk(b'IHDR', ihdr)
     
-    # IDAT chunk - pixel data
-    raw_data = b''
-    for y in range(height):
-        raw_data += b'\x00'  # Filter type
-        for x in range(width):
-            raw_data += bytes([r, g, b])
+    # IDAT chunk - pixel data: every row is the filter type byte followed by the same pixel
+    row = b'\x00' + bytes((r, g, b)) * width
     
-    compressed = zlib.compress(raw_data)
+    # Feed the row to zlib repeatedly instead of materializing all rows; solid color
+    # compresses to almost nothing at any level, so use the fastest
+    compressor = zlib.compressobj(level=1)
+    compressed = bytearray()
+    for _ in range(height):
+        compressed += compressor.compress(row)
+    compressed += compressor.flush()
+    compressed = bytes(compressed)
     png += chunk(b'IDAT', compressed)
     
     # IEND chunk
@@ -1,8 +1,6 @@
 # Quick fix script - run this to patch the refinement section
 # This removes the problematic refinement that adds "No specific requirements"
 
-import re
-
 # Path to your server.py file
 SERVER_PY_PATH = r"C:\workspace\taraz\salespro\backend\server.py"
 
@@ -10,46 +8,9 @@ SERVER_PY_PATH = r"C:\workspace\taraz\salespro\backend\server.py"
 with open(SERVER_PY_PATH, 'r', encoding='utf-8') as f:
     content = f.read()
 
-# Pattern to find and replace
-old_pattern = r'''    # ============== 1\. EXTRACT AND REFINE USER ADJUSTMENTS ==============
-    user_adjustments = form_data\.get\('user_adjustments', ''\)
-    user_adjustments_section = ""
-    
-    if user_adjustments:
-        # Use AI to refine and structure user adjustments
-        refinement_prompt = f"""You are an expert at refining user input into professional microsite requirements\.
-
-User provided these additional details:
-"""\{user_adjustments\}"""
-
-Your task:
-1\. Extract key information about design preferences, content requirements, features, or any specific requests
-2\. Organize them into clear, actionable points
-3\. Remove any conversational filler \("please", "I want", "can you add", etc\.\)
-4\. Keep technical terms and specific requirements intact
-5\. Format as bullet points under relevant categories
-
-Categories to use \(only include if relevant\):
-- Design & UI: visual preferences, layout, colors, style
-- Content: specific text, messaging, tone adjustments
-- Features: interactive elements, functionality requests
-- Personalization: company-specific details \(CEO, team, pricing, etc\.\)
-- Technical: integrations, performance requirements
-
-Output format:
-## Category Name
-- Specific requirement 1
-- Specific requirement 2
-
-Only include categories that have content\. Be concise and professional\."""
-        
-        try:
-            refined_adjustments = await generate_llm_response\(refinement_prompt\)
-            user_adjustments_section = f"\\n\\n## 📝 Additional Requirements\\n\{refined_adjustments\}\\n"
-        except Exception as e:
-            logger\.error\(f"Error refining user adjustments: \{str\(e\)\}"\)
-            # Fallback to original if refinement fails
-            user_adjustments_section = f"\\n\\n## 📝 Additional Details from User\\n\{user_adjustments\}\\n"'''
+# The block to replace runs from the section header line through the fallback assignment line
+START_MARKER = "    # ============== 1. EXTRACT AND REFINE USER ADJUSTMENTS =============="
+END_MARKER = 'user_adjustments_section = f"\\n\\n## 📝 Additional Details from User\\n{user_adjustments}\\n"'
 
 # New improved code
 new_code = '''    # ============== 1. EXTRACT AND REFINE USER ADJUSTMENTS ==============
@@ -65,8 +26,15 @@ new_code = '''    # ============== 1. EXTRACT AND REFINE USER ADJUSTMENTS ======
         if not is_vague:
             user_adjustments_section = f"\\n\\n## 📝 Additional Requirements\\n{user_adjustments}\\n"'''
 
-# Replace
-content = re.sub(old_pattern, new_code, content, flags=re.DOTALL)
+# Replace the marked line range with plain string searches (no regex over the whole file)
+start = content.find(START_MARKER)
+end = content.find(END_MARKER, start) if start != -1 else -1
+if end == -1:
+    print("❌ Refinement section not found - already patched or server.py has changed.")
+    raise SystemExit(1)
+end += len(END_MARKER)
+
+content = content[:start] + new_code + content[end:]
 
 # Write back
 with open(SERVER_PY_PATH, 'w', encoding='utf-8') as f:
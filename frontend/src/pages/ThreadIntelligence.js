@@ -39,6 +39,7 @@ const ThreadIntelligence = ({ user, onLogout }) => {
   const [loading, setLoading] = useState(false);
   const [loadingFiles, setLoadingFiles] = useState(false);
   const [analysis, setAnalysis] = useState(null);
+  const [lastAnalyzedRequest, setLastAnalyzedRequest] = useState(null);
   const [threadText, setThreadText] = useState('');
   const [customInputs, setCustomInputs] = useState('');
   const [selectedTone, setSelectedTone] = useState('professional');
@@ -74,17 +75,25 @@ const ThreadIntelligence = ({ user, onLogout }) => {
       return;
     }
 
+    const payload = {
+      thread_text: threadText,
+      custom_inputs: customInputs,
+      tone: selectedTone,
+      selected_case_studies: selectedCaseStudies,
+      auto_pick_case_studies: autoPickCaseStudies,
+    };
+    const requestKey = JSON.stringify(payload);
+
     setLoading(true);
     try {
+      // Analyzing the same input again asks for a fresh response instead of the cached one
       const response = await axios.post(`${API}/thread/analyze`, {
-        thread_text: threadText,
-        custom_inputs: customInputs,
-        tone: selectedTone,
-        selected_case_studies: selectedCaseStudies,
-        auto_pick_case_studies: autoPickCaseStudies,
+        ...payload,
+        regenerate: requestKey === lastAnalyzedRequest,
       });
 
       setAnalysis(response.data);
+      setLastAnalyzedRequest(requestKey);
       toast.success('Thread analyzed successfully!');
     } catch (error) {
       toast.error(error.response?.data?.detail || 'Failed to analyze thread');
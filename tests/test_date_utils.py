@@ -0,0 +1,22 @@
+"""
+Tests for shared date helpers
+"""
+from datetime import datetime, timedelta, timezone
+
+from config.date_utils import format_published_date
+
+
+def test_midnight_dates_serialize_as_date_only():
+    assert format_published_date(datetime(2024, 6, 1)) == "2024-06-01"
+    assert format_published_date(datetime(2024, 6, 1, tzinfo=timezone.utc)) == "2024-06-01"
+
+
+def test_dates_with_time_or_offset_keep_full_iso_format():
+    assert format_published_date(datetime(2024, 6, 1, 10, 5)) == "2024-06-01T10:05:00"
+    offset = timezone(timedelta(hours=5))
+    assert format_published_date(datetime(2024, 6, 1, tzinfo=offset)) == "2024-06-01T00:00:00+05:00"
+
+
+def test_legacy_strings_and_missing_values_pass_through():
+    assert format_published_date("6/1/2024") == "6/1/2024"
+    assert format_published_date(None) is None
@@ -0,0 +1,129 @@
+"""
+Tests for the LLM prompt cache (exact, semantic and TTL behaviour)
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+import llm_cache
+from llm_cache import SemanticPromptCache
+
+
+class FakeCollection:
+    """In-memory stand-in for the Motor collection calls the cache makes"""
+
+    def __init__(self):
+        self.docs = {}
+        self.indexes = []
+
+    async def create_index(self, keys, **kwargs):
+        self.indexes.append((keys, kwargs))
+
+    async def find_one(self, query, projection=None):
+        doc = self.docs.get(query["_id"])
+        if doc is None:
+            return None
+        cutoff = query.get("created_at", {}).get("$gt")
+        if cutoff is not None and doc["created_at"] <= cutoff:
+            return None
+        return dict(doc)
+
+    async def replace_one(self, query, doc, upsert=False):
+        self.docs[query["_id"]] = dict(doc)
+
+
+def keyword_embedding(text):
+    """Tiny deterministic embedding: counts of a few words"""
+    words = text.split()
+    return np.array([words.count(w) for w in ("pricing", "demo", "contract", "invoice")], dtype=float)
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_exact_hit_ignores_formatting_differences():
+    cache = SemanticPromptCache()
+    run(cache.set("Hello   there\nBob", {"response": "hi"}, "user-1"))
+    assert run(cache.get("hello there bob", "user-1")) == {"response": "hi"}
+
+
+def test_exact_entries_are_scoped_to_context():
+    cache = SemanticPromptCache()
+    run(cache.set("same thread", {"response": "for user 1"}, "user-1"))
+    assert run(cache.get("same thread", "user-2")) is None
+
+
+def test_exact_layer_evicts_least_recently_used():
+    cache = SemanticPromptCache(max_entries=2)
+    run(cache.set("a", {"response": "a"}))
+    run(cache.set("b", {"response": "b"}))
+    run(cache.get("a"))
+    run(cache.set("c", {"response": "c"}))
+    assert run(cache.get("b")) is None
+    assert run(cache.get("a")) == {"response": "a"}
+
+
+def test_semantic_layer_is_off_by_default():
+    cache = SemanticPromptCache(embedding_function=keyword_embedding)
+    run(cache.set("pricing demo for Acme", {"response": "acme"}, "user-1"))
+    assert run(cache.get("pricing demo for Globex", "user-1")) is None
+
+
+def test_semantic_hit_when_enabled():
+    cache = SemanticPromptCache(embedding_function=keyword_embedding, semantic=True)
+    run(cache.set("pricing demo for Acme", {"response": "acme"}, "user-1"))
+    assert run(cache.get("pricing demo for Globex", "user-1")) == {"response": "acme"}
+    # Different topic stays a miss, and clusters never cross contexts
+    assert run(cache.get("invoice contract for Globex", "user-1")) is None
+    assert run(cache.get("pricing demo for Globex", "user-2")) is None
+
+
+def test_semantic_needs_an_embedding_function():
+    cache = SemanticPromptCache(semantic=True)
+    assert cache.semantic is False
+
+
+def test_exact_entries_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(llm_cache.time, "monotonic", lambda: now[0])
+    cache = SemanticPromptCache(ttl_seconds=60)
+    run(cache.set("thread", {"response": "r"}))
+
+    now[0] += 59
+    assert run(cache.get("thread")) == {"response": "r"}
+    now[0] += 2
+    assert run(cache.get("thread")) is None
+
+
+def test_semantic_clusters_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(llm_cache.time, "monotonic", lambda: now[0])
+    cache = SemanticPromptCache(embedding_function=keyword_embedding, semantic=True, ttl_seconds=60)
+    run(cache.set("pricing demo for Acme", {"response": "acme"}))
+
+    now[0] += 61
+    assert run(cache.get("pricing demo for Globex")) is None
+
+
+def test_persistent_layer_round_trip_and_ttl_index():
+    collection = FakeCollection()
+    run(SemanticPromptCache(collection, ttl_seconds=60).ensure_indexes())
+    assert collection.indexes == [("created_at", {"expireAfterSeconds": 60})]
+
+    run(SemanticPromptCache(collection, ttl_seconds=60).set("thread", {"response": "r"}, "user-1"))
+    # A fresh instance (e.g. after a restart) finds the persisted entry
+    assert run(SemanticPromptCache(collection, ttl_seconds=60).get("thread", "user-1")) == {"response": "r"}
+
+
+def test_expired_persistent_entries_are_ignored():
+    collection = FakeCollection()
+    cache = SemanticPromptCache(collection, ttl_seconds=60)
+    key = cache.make_key("thread", "user-1")
+    collection.docs[key] = {
+        "_id": key,
+        "response": {"response": "stale"},
+        "created_at": datetime.now(timezone.utc) - timedelta(seconds=120)
+    }
+    assert run(cache.get("thread", "user-1")) is None
@@ -0,0 +1,36 @@
+"""
+Tests for scraper_worker helpers
+"""
+from scraper_worker import compute_content_hash, fallback_case_study_summary
+
+
+def test_content_hash_is_stable_for_same_content():
+    study = {"title": "Claims automation", "description": "Cut processing time by 40%"}
+    assert compute_content_hash(study) == compute_content_hash(dict(study))
+
+
+def test_content_hash_changes_with_description():
+    before = {"title": "Claims automation", "description": "Cut processing time by 40%"}
+    after = {"title": "Claims automation", "description": "Cut processing time by 60%"}
+    assert compute_content_hash(before) != compute_content_hash(after)
+
+
+def test_content_hash_handles_missing_description():
+    # crawl_zuci_with_playwright sets description=None for pages without text
+    with_none = {"title": "Claims automation", "description": None}
+    without_key = {"title": "Claims automation"}
+    assert compute_content_hash(with_none) == compute_content_hash(without_key)
+
+
+def test_content_hash_handles_missing_title():
+    assert compute_content_hash({"title": None, "description": None}) == compute_content_hash({})
+
+
+def test_fallback_summary_handles_missing_description():
+    study = {"title": "Claims automation", "category": "Finance", "type": "Use Case", "description": None}
+    assert fallback_case_study_summary(study) == "Claims automation\nFinance - Use Case\n"
+
+
+def test_fallback_summary_truncates_description():
+    summary = fallback_case_study_summary({"title": "T", "description": "x" * 500})
+    assert summary == "T\nGeneral - Case Study\n" + "x" * 200